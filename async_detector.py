@@ -0,0 +1,174 @@
+"""Non-blocking detection for live streams, with newest-frame semantics and load shedding.
+
+The stream thread calls `process(frame)`, which never waits for the model. Every
+`interval`-th frame is handed to a background worker through a one-slot queue that drops
+the older frame, so the worker always detects on the newest one. Every frame is drawn
+with the most recent detections.
+
+An adaptive controller steers toward a target output FPS and a detection latency
+budget (capture of the detected frame -> result ready). It lowers the model input
+size (the `imgsz` passed to `infer_fn`, so the model letterboxes to fewer pixels) when
+detections arrive too late, detects less often when the stream itself drops below the
+target FPS, and gives both back once there is headroom. Models with a fixed input
+shape (static ONNX/OpenVINO exports) pass scale_resolution=False and only shed load
+through the interval.
+
+If `infer_fn` raises, the error is printed and reported by status() and draw_status(),
+the old boxes are cleared so they aren't drawn as if they were current, and the worker
+retries on newer frames after a growing back-off.
+"""
+
+import time
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from live_pipeline import LatestQueue, StageStats
+from detection_postprocess import EMPTY_DETECTIONS, results_to_array
+
+TARGET_FPS = 15
+LATENCY_BUDGET_MS = 300
+MIN_SCALE = 0.4
+IMGSZ = 640
+MAX_INTERVAL = 6
+ADAPT_PERIOD_S = 1.0
+ERROR_BACKOFF_S = 0.5
+MAX_ERROR_BACKOFF_S = 5.0
+
+
+class AsyncDetector:
+    """Runs `infer_fn(frame, imgsz) -> results` in a worker thread on the newest submitted frame."""
+
+    def __init__(self, infer_fn, target_fps=TARGET_FPS, latency_budget_ms=LATENCY_BUDGET_MS,
+                 min_scale=MIN_SCALE, max_interval=MAX_INTERVAL, adaptive=True, imgsz=IMGSZ,
+                 scale_resolution=True):
+        self.infer_fn = infer_fn
+        self.imgsz = imgsz
+        self.scale_resolution = scale_resolution
+        self.target_fps = target_fps
+        self.latency_budget_ms = latency_budget_ms
+        self.min_scale = min_scale
+        self.max_interval = max_interval
+        self.adaptive = adaptive
+
+        self.scale = 1.0
+        self.interval = 1
+        self.frame_index = 0
+        self.detections = EMPTY_DETECTIONS
+        self.detection_latencies = deque(maxlen=30)
+        self.output_stats = StageStats(window=60)
+        self.detect_stats = StageStats(window=30)
+        self.last_adapt = time.perf_counter()
+        self.error = None
+        self.error_count = 0
+
+        self.lock = threading.Lock()
+        self.frames = LatestQueue(1)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        failures = 0  # consecutive, for the back-off
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            captured_at, imgsz, frame = item
+            start = time.perf_counter()
+            try:
+                detections = results_to_array(self.infer_fn(frame, imgsz))
+            except Exception as e:
+                failures += 1
+                print(f"⚠ Detection failed ({failures} in a row), retrying on a newer frame: {e!r}")
+                with self.lock:
+                    self.error = e
+                    self.error_count += 1
+                    self.detections = EMPTY_DETECTIONS
+                time.sleep(min(MAX_ERROR_BACKOFF_S, ERROR_BACKOFF_S * failures))
+                continue
+            failures = 0
+            done = time.perf_counter()
+            with self.lock:
+                self.detections = detections
+                self.detection_latencies.append(done - captured_at)
+                self.error = None
+            self.detect_stats.tick(done - start)
+
+    def submit(self, frame):
+        """Queues frame for detection if it's on the current interval. Never blocks."""
+        self.frame_index += 1
+        if (self.frame_index - 1) % self.interval:
+            return
+        self.frames.put((time.perf_counter(), self.model_imgsz, frame))
+
+    @property
+    def model_imgsz(self):
+        """The imgsz for the current scale: a multiple of 32 (the model stride), at least 32."""
+        return max(32, int(self.imgsz * self.scale) // 32 * 32)
+
+    def process(self, frame):
+        """Submits frame and returns the latest (N, 6) detections in its coordinates."""
+        self.submit(frame)
+        self.output_stats.tick()
+        if self.adaptive:
+            self._adapt()
+        with self.lock:
+            return self.detections
+
+    @property
+    def latency_ms(self):
+        with self.lock:
+            return 1000 * float(np.median(self.detection_latencies)) if self.detection_latencies else 0.0
+
+    def _adapt(self):
+        now = time.perf_counter()
+        if now - self.last_adapt < ADAPT_PERIOD_S or self.output_stats.count < 10:
+            return
+        self.last_adapt = now
+        fps, latency = self.output_stats.fps, self.latency_ms
+        can_shrink = self.scale_resolution and self.scale > self.min_scale
+
+        if latency > self.latency_budget_ms and can_shrink:
+            self.scale = max(self.min_scale, round(self.scale * 0.8, 2))
+        elif fps < 0.9 * self.target_fps or latency > self.latency_budget_ms:
+            if self.interval < self.max_interval:
+                self.interval += 1
+            elif can_shrink:
+                self.scale = max(self.min_scale, round(self.scale * 0.8, 2))
+        elif latency < 0.6 * self.latency_budget_ms and fps >= self.target_fps:
+            if self.interval > 1:
+                self.interval -= 1
+            elif self.scale < 1.0:
+                self.scale = min(1.0, round(self.scale * 1.15, 2))
+
+    def status(self):
+        """Controller state; 'error' is the last detection error (None once a detection succeeds again)."""
+        with self.lock:
+            error = f"{type(self.error).__name__}: {self.error}" if self.error is not None else None
+            errors = self.error_count
+        return {'fps': round(self.output_stats.fps, 1), 'target_fps': self.target_fps,
+                'latency_ms': round(self.latency_ms, 1), 'latency_budget_ms': self.latency_budget_ms,
+                'detect_fps': round(self.detect_stats.fps, 1), 'scale': self.scale, 'interval': self.interval,
+                'dropped': self.frames.dropped, 'error': error, 'errors': errors}
+
+    def draw_status(self, frame):
+        """Draws 'FPS x/target | latency y/budget ms | input scale | interval' onto frame.
+
+        While detection is failing, a red 'DETECTION FAILING' line with the error is drawn above it.
+        """
+        s = self.status()
+        text = (f"FPS {s['fps']:.1f}/{s['target_fps']} | lat {s['latency_ms']:.0f}/{s['latency_budget_ms']} ms | "
+                f"res {int(s['scale'] * 100)}% | every {s['interval']}")
+        cv2.putText(frame, text, (10, frame.shape[0] - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+        cv2.putText(frame, text, (10, frame.shape[0] - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        if s['error']:
+            error = f"DETECTION FAILING: {s['error']}"[:80]
+            cv2.putText(frame, error, (10, frame.shape[0] - 34), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+            cv2.putText(frame, error, (10, frame.shape[0] - 34), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+        return frame
+
+    def close(self):
+        self.frames.close()
+        self.thread.join(timeout=2)
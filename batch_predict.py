@@ -0,0 +1,306 @@
+"""Headless batch inference over a directory tree of images.
+
+Walks SOURCE for images, decodes them in a thread pool (prefetching ahead of the
+model), runs the YOLO model in batches on the chosen inference backend and writes
+predictions in the class-id space of master.yaml, either as YOLO .txt files
+(`cls x y w h conf`, normalized), a JSONL file or Parquet part files.
+
+cv2 releases the GIL while decoding, so threads decode in parallel and hand over the
+decoded arrays without pickling them between processes. Re-running with the same
+output skips images that already have predictions.
+
+    python batch_predict.py D:\\drone_captures --output preds --format yolo
+    python batch_predict.py D:\\drone_captures --output preds.jsonl --format jsonl --benchmark
+    python batch_predict.py D:\\drone_captures --output preds --backend openvino-int8
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import yaml
+
+from inference_backend import BACKENDS, load_backend
+from detection_postprocess import result_to_array, iter_detections
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+PARQUET_PART_SIZE = 5000
+TAIL_BLOCK = 64 * 1024
+
+
+def find_images(source):
+    """Returns image paths under `source`, sorted so runs (and resumes) are deterministic."""
+    paths = []
+    for root, _, files in os.walk(source):
+        paths.extend(Path(root) / name for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+
+def decode_image(path):
+    """Decoder thread: decodes one image. Returns (path, image or None, seconds spent)."""
+    start = time.perf_counter()
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    return path, image, time.perf_counter() - start
+
+
+def load_class_map(model_names, master_yaml):
+    """Maps model class ids to master.yaml class ids by name. Returns (id map, master names)."""
+    with open(master_yaml, 'r') as f:
+        names = yaml.safe_load(f)['names']
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    master_ids = {str(name).strip().lower(): int(i) for i, name in names.items()}
+    id_map = {}
+    for cls_id, name in model_names.items():
+        master_id = master_ids.get(str(name).strip().lower())
+        if master_id is None:
+            print(f"⚠ Model class '{name}' is not in {Path(master_yaml).name}; its detections are skipped.")
+        else:
+            id_map[cls_id] = master_id
+    return id_map, names
+
+
+# --- Output writers ---
+
+class YoloTxtWriter:
+    """One .txt per image, mirroring the source tree. Images without detections get an empty file."""
+
+    def __init__(self, output, source):
+        self.output = Path(output)
+        self.source = Path(source)
+
+    def _label_path(self, image_path):
+        return (self.output / image_path.relative_to(self.source)).with_suffix('.txt')
+
+    def done(self, image_paths):
+        return {p for p in image_paths if self._label_path(p).exists()}
+
+    def write(self, image_path, width, height, detections):
+        label_path = self._label_path(image_path)
+        label_path.parent.mkdir(parents=True, exist_ok=True)
+        lines = []
+        for d in detections:
+            x1, y1, x2, y2 = d['box']
+            lines.append(f"{d['class_id']} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+                         f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f} {d['confidence']:.4f}")
+        # Write to a temp name first so an interrupted run never leaves a partial file that looks done.
+        tmp_path = label_path.with_suffix('.txt.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines))
+        os.replace(tmp_path, label_path)
+
+    def close(self):
+        pass
+
+
+class JsonlWriter:
+    """One JSON object per image, appended to a single file."""
+
+    def __init__(self, output, source):
+        self.path = Path(output)
+        self.source = Path(source)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = None
+
+    def done(self, image_paths):
+        finished = set()
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        finished.add(json.loads(line)['image'])
+                    except (ValueError, KeyError):
+                        continue  # a line cut off by an interrupted run
+        return {p for p in image_paths if str(p.relative_to(self.source)) in finished}
+
+    def _truncate_partial_line(self):
+        """Cuts a trailing line left unfinished by an interrupted run, so appends start on a fresh line."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(0, pos - TAIL_BLOCK)
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b'\n')
+                if newline >= 0:
+                    pos = start + newline + 1
+                    break
+                pos = start
+            if pos < end:
+                f.truncate(pos)
+
+    def write(self, image_path, width, height, detections):
+        if self.file is None:
+            self._truncate_partial_line()
+            self.file = open(self.path, 'a')
+        record = {'image': str(image_path.relative_to(self.source)), 'width': width, 'height': height,
+                  'detections': detections}
+        self.file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class ParquetWriter:
+    """Flat rows (one per detection, plus one empty row per image) written as Parquet part files."""
+
+    def __init__(self, output, source):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow. Run: pip install pyarrow")
+        self.dir = Path(output)
+        self.source = Path(source)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.rows = []
+        self.images_in_part = 0
+
+    def done(self, image_paths):
+        import pyarrow.parquet as pq
+        finished = set()
+        for part in self.dir.glob('part-*.parquet'):
+            finished.update(pq.read_table(part, columns=['image']).column('image').to_pylist())
+        return {p for p in image_paths if str(p.relative_to(self.source)) in finished}
+
+    def write(self, image_path, width, height, detections):
+        image = str(image_path.relative_to(self.source))
+        if not detections:
+            self.rows.append({'image': image, 'width': width, 'height': height, 'class_id': None,
+                              'class_name': None, 'confidence': None, 'x1': None, 'y1': None, 'x2': None, 'y2': None})
+        for d in detections:
+            x1, y1, x2, y2 = d['box']
+            self.rows.append({'image': image, 'width': width, 'height': height, 'class_id': d['class_id'],
+                              'class_name': d['class_name'], 'confidence': d['confidence'],
+                              'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+        self.images_in_part += 1
+        if self.images_in_part >= PARQUET_PART_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        part_path = self.dir / f"part-{time.time_ns()}.parquet"
+        pq.write_table(pa.Table.from_pylist(self.rows), part_path)
+        self.rows = []
+        self.images_in_part = 0
+
+    def close(self):
+        self._flush()
+
+
+WRITERS = {'yolo': YoloTxtWriter, 'jsonl': JsonlWriter, 'parquet': ParquetWriter}
+
+
+# --- Main loop ---
+
+def prefetch_images(paths, executor, depth):
+    """Yields decode results in order while keeping up to `depth` decodes in flight."""
+    pending = deque()
+    path_iter = iter(paths)
+    for path in path_iter:
+        pending.append(executor.submit(decode_image, path))
+        if len(pending) >= depth:
+            break
+    while pending:
+        yield pending.popleft().result()
+        next_path = next(path_iter, None)
+        if next_path is not None:
+            pending.append(executor.submit(decode_image, next_path))
+
+
+def run(args):
+    model = load_backend(args.weights, args.backend, args.master_yaml, args.imgsz)
+    id_map, master_names = load_class_map(model.names, args.master_yaml)
+    writer = WRITERS[args.format](args.output, args.source)
+
+    image_paths = find_images(args.source)
+    finished = writer.done(image_paths)
+    todo = [p for p in image_paths if p not in finished]
+    print(f"🔎 Found {len(image_paths)} images, {len(finished)} already predicted, {len(todo)} to go.")
+
+    timings = {'decode': 0.0, 'infer': 0.0, 'write': 0.0}
+    processed = 0
+    unreadable = 0
+    start_time = time.perf_counter()
+
+    def flush(batch):
+        nonlocal processed
+        t = time.perf_counter()
+        results = model([image for _, image in batch], conf=args.conf, imgsz=args.imgsz, verbose=False)
+        timings['infer'] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        for (path, image), result in zip(batch, results):
+            detections = []
+            for x1, y1, x2, y2, confidence, cls_id in iter_detections(result_to_array(result)):
+                if cls_id in id_map:
+                    master_id = id_map[cls_id]
+                    detections.append({'class_id': master_id, 'class_name': master_names[master_id],
+                                       'confidence': round(confidence, 4), 'box': [x1, y1, x2, y2]})
+            writer.write(path, image.shape[1], image.shape[0], detections)
+        timings['write'] += time.perf_counter() - t
+        processed += len(batch)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        batch = []
+        for path, image, decode_seconds in prefetch_images(todo, executor, args.batch_size * args.prefetch):
+            timings['decode'] += decode_seconds
+            if image is None:
+                print(f"⚠ Could not decode {path}")
+                unreadable += 1
+                continue
+            batch.append((path, image))
+            if len(batch) == args.batch_size:
+                flush(batch)
+                batch = []
+                if processed % (args.batch_size * 50) == 0:
+                    print(f"   {processed}/{len(todo)} images")
+        if batch:
+            flush(batch)
+    writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\n✅ Predicted {processed} images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} images/s)."
+          + (f" {unreadable} could not be decoded." if unreadable else ""))
+    if args.benchmark:
+        print("\n📊 Benchmark (images/s per stage, busy time only):")
+        for stage, seconds in timings.items():
+            # Decoding runs on `workers` threads at once, so its wall-clock throughput is higher.
+            scale = args.workers if stage == 'decode' else 1
+            rate = processed / seconds * scale if seconds else float('inf')
+            print(f"  - {stage:<6}: {seconds:8.2f}s busy | {rate:8.1f} images/s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the D.O.G. YOLO model over a directory of images.")
+    parser.add_argument('source', help="Folder to search (recursively) for images.")
+    parser.add_argument('--output', required=True,
+                        help="Output folder (yolo/parquet) or .jsonl file (jsonl).")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='yolo')
+    parser.add_argument('--weights', default='DOG.pt')
+    parser.add_argument('--backend', choices=BACKENDS, default=os.environ.get('DOG_BACKEND', 'torch'),
+                        help="Inference backend (default: $DOG_BACKEND or torch); exported next to the weights once.")
+    parser.add_argument('--master-yaml', default=r"C:\Users\HP\Desktop\master_dataset\master.yaml",
+                        help="Class ids in the output follow this file's names.")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Decoder threads.")
+    parser.add_argument('--prefetch', type=int, default=3, help="Batches decoded ahead of the model.")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--benchmark', action='store_true', help="Report decode/infer/write throughput.")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    run(parse_args())
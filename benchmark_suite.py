@@ -0,0 +1,322 @@
+"""Reproducible benchmarks for the dataset tools and the annotation path.
+
+Generates synthetic source datasets (see synthetic_dataset.py), then times:
+  - remap_and_copy_files / remap_and_copy_files_parallel (merge)
+  - process_and_remap_dataset (filter), cold and warm (label cache + manifest present)
+  - count_class_instances (count), cold and warm (label cache present)
+  - reading the merged train split as loose files vs. tar shards (shard_export.py)
+  - annotate_frame from the Streamlit app, with a stub model so no weights or GPU are needed
+
+The scripts are driven through their module-level paths, which are pointed at a
+scratch folder. Results are written as JSON so runs can be compared across commits:
+
+    python benchmark_suite.py --images 500 --output bench_results.json
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import importlib.util
+from pathlib import Path
+from importlib.machinery import SourceFileLoader
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import combiningalldatasetfinalworking as merge
+import sortingclass
+import classimgcounting
+from synthetic_dataset import generate_sources
+from shard_export import export_shards, benchmark_reads
+
+APP_PATH = Path(__file__).parent / "milestone1STREAMLIT.PY"
+SPLITS = ['train', 'valid', 'test']
+
+
+# --- Helpers ---
+
+@contextlib.contextmanager
+def quiet():
+    """Swallows the scripts' progress output so it isn't part of the measurement."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def time_runs(fn, repeat, setup=None):
+    """Runs setup() (untimed) then fn() `repeat` times. Returns the wall times in seconds."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        with quiet():
+            fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times, items):
+    """Best/median/mean of the runs plus throughput for the median run."""
+    median = float(np.median(times))
+    return {'runs_s': [round(t, 4) for t in times], 'best_s': round(min(times), 4),
+            'median_s': round(median, 4), 'mean_s': round(float(np.mean(times)), 4),
+            'items': items, 'items_per_s': round(items / median, 1) if median else None}
+
+
+def reset_dir(path):
+    if path.exists():
+        shutil.rmtree(path)
+
+
+def count_files(root, pattern):
+    return sum(1 for _ in Path(root).glob(pattern))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- Benchmarks ---
+
+def bench_merge(source_paths, merged_path, repeat, workers):
+    """Times the serial and parallel merge into merged_path. Leaves the parallel output behind."""
+    merge.output_path = merged_path
+    sources = [(path, merge.get_class_list_from_yaml(path / 'data.yaml')) for path in source_paths]
+    label_count = sum(count_files(path, '*/labels/*.txt') for path in source_paths)
+
+    def setup():
+        reset_dir(merged_path)
+        merge.stats.clear()
+        merge.throughput.clear()
+        merge.seen_keys.clear()
+
+    def run_serial():
+        for path, classes in sources:
+            for split in SPLITS:
+                merge.remap_and_copy_files(path, split, classes)
+
+    results = {'remap_and_copy_files': summarize(time_runs(run_serial, repeat, setup), label_count)}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def run_parallel():
+            for path, classes in sources:
+                for split in SPLITS:
+                    merge.remap_and_copy_files_parallel(path, split, classes, executor)
+            merge.create_master_yaml()
+
+        # The pool is warmed up by the first run; report its workers and link mode alongside.
+        results['remap_and_copy_files_parallel'] = summarize(time_runs(run_parallel, repeat, setup), label_count)
+        results['remap_and_copy_files_parallel'].update({'workers': workers, 'link_mode': merge.LINK_MODE})
+    return results
+
+
+def write_metrics_file(path, class_names, seed):
+    """Random per-class scores, roughly half of them above the filter threshold."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        for name, score in zip(class_names, rng.uniform(0.2, 1.0, len(class_names))):
+            f.write(f"{name}\t{score:.3f}\n")
+
+
+def bench_filter(merged_path, filtered_path, metrics_path, repeat):
+    """Times process_and_remap_dataset on a fresh output (cold) and on an unchanged rerun (warm)."""
+    sortingclass.original_dataset_path = merged_path
+    sortingclass.original_yaml_path = merged_path / "master.yaml"
+    sortingclass.output_dataset_path = filtered_path
+    sortingclass.METRICS_PATH = metrics_path
+    label_count = count_files(merged_path, '*/labels/*.txt')
+
+    def cold_setup():
+        reset_dir(filtered_path)
+        reset_dir(merged_path / '.label_cache')
+
+    cold = time_runs(sortingclass.process_and_remap_dataset, repeat, cold_setup)
+    warm = time_runs(sortingclass.process_and_remap_dataset, repeat)
+    return {'process_and_remap_dataset_cold': summarize(cold, label_count),
+            'process_and_remap_dataset_warm': summarize(warm, label_count)}
+
+
+def bench_count(merged_path, repeat):
+    """Times count_class_instances without (cold) and with (warm) the label cache."""
+    label_count = count_files(merged_path, '*/labels/*.txt')
+    run = lambda: classimgcounting.count_class_instances(merged_path, "master.yaml")
+    cold = time_runs(run, repeat, lambda: reset_dir(merged_path / '.label_cache'))
+    warm = time_runs(run, repeat)
+    return {'count_class_instances_cold': summarize(cold, label_count),
+            'count_class_instances_warm': summarize(warm, label_count)}
+
+
+def bench_shards(merged_path, shards_path, workers):
+    """Times export_shards and reading the train split as loose files, shard stream and random access."""
+    reset_dir(shards_path)
+    start = time.perf_counter()
+    with quiet():
+        manifest = export_shards(merged_path, shards_path, workers=workers)
+    samples = sum(split['samples'] for split in manifest['splits'].values())
+    return {'export_shards': summarize([time.perf_counter() - start], samples),
+            'read_train_split': benchmark_reads(merged_path, shards_path, 'train')}
+
+
+class _StubBoxes:
+    def __init__(self, data):
+        self.data = data
+
+
+class _StubResult:
+    def __init__(self, data):
+        self.boxes = _StubBoxes(data)
+
+
+class StubModel:
+    """Returns a fixed set of random detections for every frame, like a YOLO model would."""
+
+    def __init__(self, class_names, image_size, detections_per_frame, seed=0):
+        rng = np.random.default_rng(seed)
+        width, height = image_size
+        self.names = dict(enumerate(class_names))
+        x1 = rng.uniform(0, width * 0.8, detections_per_frame)
+        y1 = rng.uniform(0, height * 0.8, detections_per_frame)
+        x2 = np.minimum(x1 + rng.uniform(20, width * 0.3, detections_per_frame), width - 1)
+        y2 = np.minimum(y1 + rng.uniform(20, height * 0.3, detections_per_frame), height - 1)
+        conf = rng.uniform(0.05, 1.0, detections_per_frame)
+        cls = rng.integers(0, len(class_names), detections_per_frame)
+        self.data = np.stack([x1, y1, x2, y2, conf, cls], axis=1).astype(np.float32)
+
+    def __call__(self, frame, verbose=False):
+        return [_StubResult(self.data)]
+
+
+def load_app_module():
+    """Imports the Streamlit app as a module (its UI only runs under __main__)."""
+    loader = SourceFileLoader("milestone1STREAMLIT", str(APP_PATH))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    with quiet():
+        loader.exec_module(module)
+    return module
+
+
+def bench_annotate(image_size, frames, detections_per_frame, threshold):
+    """Times annotate_frame per frame with a stub model."""
+    try:
+        app = load_app_module()
+    except ImportError as e:
+        return {'annotate_frame': {'skipped': f"app dependencies missing: {e}"}}
+
+    model = StubModel(merge.master_class_list, image_size, detections_per_frame)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (image_size[1], image_size[0], 3), dtype=np.uint8)
+    app.annotate_frame(frame, model, threshold)  # warm up caches
+
+    per_frame = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        app.annotate_frame(frame, model, threshold)
+        per_frame.append(time.perf_counter() - start)
+    per_frame_ms = np.array(per_frame) * 1000
+    return {'annotate_frame': {
+        'frames': frames, 'detections_per_frame': detections_per_frame, 'threshold': threshold,
+        'fps': round(frames / sum(per_frame), 1),
+        'ms_per_frame': {'mean': round(float(per_frame_ms.mean()), 3),
+                         'p50': round(float(np.percentile(per_frame_ms, 50)), 3),
+                         'p95': round(float(np.percentile(per_frame_ms, 95)), 3)}}}
+
+
+# --- Main ---
+
+BENCHMARKS = ('merge', 'filter', 'count', 'shards', 'annotate')
+
+
+def run(args):
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="dog_bench_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    sources_path = workdir / "datasets_all"
+    merged_path = workdir / "master_dataset"
+    filtered_path = workdir / "master_dataset_filtered"
+    image_size = tuple(args.image_size)
+
+    config = {'sources': args.sources, 'classes_per_source': args.classes, 'images_per_source': args.images,
+              'labels_per_image': list(args.labels_per_image), 'image_size': list(image_size),
+              'repeat': args.repeat, 'frames': args.frames, 'detections_per_frame': args.detections,
+              'seed': args.seed}
+    results = {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'git_commit': git_commit(),
+                        'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count(), 'config': config},
+               'benchmarks': {}}
+
+    try:
+        print(f"🧪 Generating {args.sources} synthetic datasets in {workdir}...")
+        reset_dir(sources_path)
+        start = time.perf_counter()
+        source_paths = generate_sources(sources_path, merge.master_class_list, args.sources, args.classes,
+                                        args.images, tuple(args.labels_per_image), image_size, args.seed)
+        results['meta']['generate_s'] = round(time.perf_counter() - start, 3)
+
+        selected = args.only or BENCHMARKS
+        # Filtering, counting and sharding read the merged dataset, so the merge always runs first.
+        if {'merge', 'filter', 'count', 'shards'} & set(selected):
+            print("⏱  merge...")
+            merge_results = bench_merge(source_paths, merged_path, args.repeat, args.workers)
+            if 'merge' in selected:
+                results['benchmarks'].update(merge_results)
+        if 'filter' in selected:
+            print("⏱  filter...")
+            metrics_path = workdir / "metrics.txt"
+            write_metrics_file(metrics_path, merge.master_class_list, args.seed)
+            results['benchmarks'].update(bench_filter(merged_path, filtered_path, metrics_path, args.repeat))
+        if 'count' in selected:
+            print("⏱  count...")
+            results['benchmarks'].update(bench_count(merged_path, args.repeat))
+        if 'shards' in selected:
+            print("⏱  shards...")
+            results['benchmarks'].update(bench_shards(merged_path, workdir / "master_shards", args.workers))
+        if 'annotate' in selected:
+            print("⏱  annotate...")
+            results['benchmarks'].update(bench_annotate(image_size, args.frames, args.detections, args.threshold))
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"📄 Results written to {args.output}")
+    else:
+        print(text)
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the merge/filter/count scripts and annotate_frame.")
+    parser.add_argument('--sources', type=int, default=3, help="Number of synthetic source datasets.")
+    parser.add_argument('--classes', type=int, default=10, help="Classes per source dataset.")
+    parser.add_argument('--images', type=int, default=200, help="Images per source dataset.")
+    parser.add_argument('--labels-per-image', type=int, nargs=2, default=(1, 5), metavar=('MIN', 'MAX'))
+    parser.add_argument('--image-size', type=int, nargs=2, default=(640, 480), metavar=('W', 'H'))
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark.")
+    parser.add_argument('--workers', type=int, default=merge.NUM_WORKERS, help="Processes for the parallel merge.")
+    parser.add_argument('--frames', type=int, default=200, help="Frames for the annotate_frame benchmark.")
+    parser.add_argument('--detections', type=int, default=20, help="Stub detections per frame.")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Confidence threshold for annotate_frame.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="Run only these benchmarks.")
+    parser.add_argument('--workdir', help="Scratch folder (kept afterwards). Defaults to a temp folder.")
+    parser.add_argument('--keep', action='store_true', help="Keep the temp folder.")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout.")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    run(parse_args())
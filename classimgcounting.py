@@ -1,6 +1,7 @@
 import yaml
 from pathlib import Path
-from collections import Counter
+
+from label_store import LabelStore, BOX_SIZE_BINS
 
 # --- CONFIGURATION ---
 
@@ -34,31 +35,21 @@ def count_class_instances(dataset_path, yaml_filename):
         print(f"❌ Error: Could not read or parse {yaml_path}. Details: {e}")
         return
 
-    class_counts = Counter()
-    image_counts = Counter()
-    
-    # Iterate through train, valid, and test splits
-    for split in ['train', 'valid', 'test']:
-        labels_dir = dataset_path / split / 'labels'
-        
-        if not labels_dir.is_dir():
+    splits = ['train', 'valid', 'test']
+    for split in splits:
+        if not (dataset_path / split / 'labels').is_dir():
             print(f"⚠️  Warning: No 'labels' directory found for '{split}' split. Skipping.")
-            continue
-        
-        # Count images by counting label files
-        label_files = list(labels_dir.glob('*.txt'))
-        image_counts[split] = len(label_files)
-        
-        # Count class instances within the label files
-        for label_file in label_files:
-            with open(label_file, 'r') as f:
-                for line in f:
-                    try:
-                        class_id = int(line.strip().split()[0])
-                        class_counts[class_id] += 1
-                    except (ValueError, IndexError):
-                        # Handle empty or malformed lines
-                        pass
+
+    # Parses every label file once; later runs memory-map the cached arrays.
+    store = LabelStore.load(dataset_path, splits)
+    num_classes = max(class_names) + 1 if class_names else 0
+    class_counts = store.class_counts(minlength=num_classes)
+    image_counts = store.label_files_per_split()
+    images_per_class = store.images_per_class(minlength=num_classes)
+    box_sizes = store.box_size_histogram(minlength=num_classes)
+    if store.malformed_rows:
+        print(f"⚠️  {store.malformed_rows} label rows have fewer than 4 coordinates; "
+              f"they are counted per class but left out of the box size histogram.")
 
     # --- Print the Report ---
     print("\n" + "="*40)
@@ -72,9 +63,22 @@ def count_class_instances(dataset_path, yaml_filename):
 
     print("\nTotal Instances per Class (across all splits):")
     for class_id, class_name in sorted(class_names.items()):
-        count = class_counts.get(class_id, 0)
+        count = int(class_counts[class_id]) if class_id < len(class_counts) else 0
         print(f"  - ID {class_id:2d} | {class_name:<40} | {count} instances")
-        
+
+    print("\nImages per Class per Split (train / valid / test):")
+    for class_id, class_name in sorted(class_names.items()):
+        per_split = images_per_class[:, class_id] if class_id < images_per_class.shape[1] else [0] * len(splits)
+        counts = ' / '.join(str(int(c)) for c in per_split)
+        print(f"  - ID {class_id:2d} | {class_name:<40} | {counts}")
+
+    bin_labels = [f"<{edge:g}" for edge in BOX_SIZE_BINS[1:]]
+    print("\nBox Size Histogram (sqrt(w*h), normalized):")
+    print(f"  {'':<48} | " + ' '.join(f"{b:>6}" for b in bin_labels))
+    for class_id, class_name in sorted(class_names.items()):
+        row = box_sizes[class_id] if class_id < len(box_sizes) else [0] * len(bin_labels)
+        print(f"  - ID {class_id:2d} | {class_name:<40} | " + ' '.join(f"{int(c):>6}" for c in row))
+
     print("="*40)
 
 
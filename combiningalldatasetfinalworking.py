@@ -1,7 +1,19 @@
 import os
+import sys
+import json
+import time
 import shutil
+import hashlib
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from dataset_manifest import Manifest, file_signature
+from image_dedup import DEFAULT_MAX_DISTANCE, HashCache, compute_hashes, find_duplicates
+from image_headers import read_image_size
 
 datasets_parent = Path(r"C:\Users\HP\Desktop\datasets_all")
 
@@ -32,12 +44,69 @@ master_class_list = [
 
 output_path = Path(r"C:\Users\HP\Desktop\master_dataset")
 
+# --- MERGE ENGINE ---
+# PARALLEL_MERGE indexes each split's images once and remaps labels in a process pool.
+# LINK_MODE is tried first for every image: 'hardlink', 'reflink', 'symlink' or 'copy'.
+# Anything that can't be linked (other drive, no privilege, FS without reflinks) is copied.
+PARALLEL_MERGE = True
+LINK_MODE = 'hardlink'
+NUM_WORKERS = os.cpu_count() or 4
+CHUNK_SIZE = 256
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.webp']
+
+# --- INCREMENTAL MERGE ---
+# With INCREMENTAL on, a manifest in the output folder records every source file's
+# size/mtime/hash, so reruns only touch added, changed or removed files.
+INCREMENTAL = True
+MANIFEST_NAME = '.merge_manifest.json'
+
+# --- NEAR-DUPLICATE FILTER ---
+# Overlapping Kaggle/Roboflow/PlantDoc exports contain the same photos. DEDUP_MODE
+# 'drop' skips near-duplicates before they are merged, 'report' only lists them in
+# duplicates.csv, None disables the stage. Images within image_dedup.DEFAULT_MAX_DISTANCE
+# bits (of a 64-bit perceptual hash) count as duplicates; the first one seen is kept. Only
+# images that will actually be merged (a label file with at least one row of a known
+# class) are compared, so the kept copy is always one that ends up in the master set.
+# Which labels qualify is cached by label size/mtime and class list in DEDUP_LABELS_NAME.
+# Duplicates across splits (e.g. train vs valid) leak evaluation data; they are listed
+# in cross_split_duplicates.csv and only dropped if DEDUP_CROSS_SPLIT is 'drop'.
+DEDUP_MODE = 'drop'
+DEDUP_CROSS_SPLIT = 'report'
+DEDUP_CACHE_NAME = '.dedup_hashes.json'
+DEDUP_LABELS_NAME = '.dedup_labels.json'
+
+# --- RESIZE STAGE ---
+# With RESIZE_MAX_SIDE set (e.g. 640), merged images larger than that are shrunk to fit
+# inside RESIZE_MAX_SIDE x RESIZE_MAX_SIDE and re-encoded as RESIZE_FORMAT at
+# RESIZE_QUALITY. The aspect ratio is kept and nothing is padded, so the normalized YOLO
+# labels stay valid (training letterboxes on the fly anyway). Images that already fit
+# and are in RESIZE_FORMAT are linked unchanged. Encoded images are cached in
+# RESIZE_CACHE_DIR inside the output folder, keyed by source file and settings, and
+# the source dimensions are cached there too, so reruns and rebuilds don't redo work.
+# Cache files that no merged image uses any more (old settings, changed or removed
+# sources) are deleted at the end of the merge.
+RESIZE_MAX_SIDE = None
+RESIZE_FORMAT = '.jpg'
+RESIZE_QUALITY = 90
+RESIZE_CACHE_DIR = '.resize_cache'
+RESIZE_CHUNK_SIZE = 16  # decoding/encoding is CPU-bound, so smaller chunks keep every worker busy
+
+# --- SHARDED EXPORT ---
+# With EXPORT_SHARDS on, the merged dataset is also packed into tar shards of about
+# SHARD_SIZE_MB each (see shard_export.py) for streaming from network/cloud storage.
+EXPORT_SHARDS = False
+SHARDS_PATH = Path(r"C:\Users\HP\Desktop\master_dataset_shards")
+SHARD_SIZE_MB = 256
 
 
 master_class_map = {name.lower().strip(): i for i, name in enumerate(master_class_list)}
 
 
 stats = defaultdict(lambda: defaultdict(int))
+throughput = defaultdict(int)
+seen_keys = set()
+image_sizes = {}  # source image path -> [bytes, mtime_ns, width, height], see load_image_sizes
+resize_cache_used = set()  # resize cache files placed during this run, see prune_resize_cache
 
 def get_class_list_from_yaml(yaml_path):
     """Reads a YOLO data.yaml file and returns the list of class names."""
@@ -53,8 +122,43 @@ def get_class_list_from_yaml(yaml_path):
         print(f"⚠ Error reading {yaml_path}: {e}")
     return []
 
-def remap_and_copy_files(original_path, split, old_classes):
-    """Reads label files, remaps class indices, and copies images/labels into master dataset."""
+def remap_label_file(label_path, old_classes):
+    """Remaps one YOLO label file to master class ids. Returns (new_lines, warnings)."""
+    new_labels = []
+    warnings = []
+    label_file = label_path.name
+    with open(label_path, 'r') as f:
+        for line in f.readlines():
+            parts = line.strip().split()
+            if not parts:
+                continue
+            old_cls_id = int(parts[0])
+
+            if old_cls_id < len(old_classes):
+                class_name = old_classes[old_cls_id].strip().lower()
+                if class_name in master_class_map:
+                    new_cls_id = master_class_map[class_name]
+                    new_line = f"{new_cls_id} {' '.join(parts[1:])}"
+                    new_labels.append(new_line)
+                else:
+                    warnings.append(f"     ⚠ Unknown class '{old_classes[old_cls_id]}' in {label_file}")
+            else:
+                warnings.append(f"     ⚠ Invalid class index {old_cls_id} in {label_file}")
+    return new_labels, warnings
+
+def find_image(image_dir, stem):
+    """Probes IMAGE_EXTENSIONS in order and returns (path, ext) of the first image found."""
+    for ext in IMAGE_EXTENSIONS:
+        image_path = image_dir / f"{stem}{ext}"
+        if image_path.exists():
+            return image_path, ext
+    return None, None
+
+def remap_and_copy_files(original_path, split, old_classes, manifest=None, skip_stems=None, resize=None):
+    """Reads label files, remaps class indices, and copies images/labels into master dataset.
+
+    With `resize` (see resize_settings) images are resized and re-encoded on the way.
+    """
     image_dir = original_path / split / 'images'
     label_dir = original_path / split / 'labels'
 
@@ -72,26 +176,22 @@ def remap_and_copy_files(original_path, split, old_classes):
     for label_file in os.listdir(label_dir):
         if not label_file.endswith('.txt'):
             continue
+        if skip_stems and Path(label_file).stem in skip_stems:
+            continue
 
-        new_labels = []
-        with open(label_dir / label_file, 'r') as f:
-            for line in f.readlines():
-                parts = line.strip().split()
-                if not parts:
-                    continue
-                old_cls_id = int(parts[0])
-
-                if old_cls_id < len(old_classes):
-                    class_name = old_classes[old_cls_id].strip().lower()
-                    if class_name in master_class_map:
-                        new_cls_id = master_class_map[class_name]
-                        new_line = f"{new_cls_id} {' '.join(parts[1:])}"
-                        new_labels.append(new_line)
-                    else:
-                        print(f"     ⚠ Unknown class '{old_classes[old_cls_id]}' in {label_file}")
-                else:
-                    print(f"     ⚠ Invalid class index {old_cls_id} in {label_file}")
+        key = f"{dataset_prefix}/{split}/{label_file}"
+        seen_keys.add(key)
+        image_path, ext = find_image(image_dir, Path(label_file).stem)
+        sources = {'label': label_dir / label_file, 'image': image_path}
+        if manifest and manifest.is_current(key, sources):
+            throughput['unchanged'] += 1
+            continue
+
+        new_labels, warnings = remap_label_file(label_dir / label_file, old_classes)
+        for warning in warnings:
+            print(warning)
 
+        outputs = []
         if new_labels:
             # Unique filenames
             new_label_file = f"{dataset_prefix}_{label_file}"
@@ -99,18 +199,480 @@ def remap_and_copy_files(original_path, split, old_classes):
 
             with open(dest_lbl_dir / new_label_file, 'w') as f:
                 f.write('\n'.join(new_labels))
+            outputs.append(dest_lbl_dir / new_label_file)
 
-            copied = False
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.webp']:
-                image_path = image_dir / f"{Path(label_file).stem}{ext}"
-                if image_path.exists():
-                    shutil.copy(image_path, dest_img_dir / f"{new_image_name}{ext}")
-                    copied = True
-                    stats[dataset_prefix][split] += 1
-                    break
-            if not copied:
+            if image_path:
+                dest_image, method, size, info = place_image(image_path, dest_img_dir, new_image_name, ext, 'copy',
+                                                             resize, image_sizes.get(str(image_path)))
+                outputs.append(dest_image)
+                if info:
+                    _count_resize(throughput, info)
+                    if info['size_record']:
+                        image_sizes[str(image_path)] = info['size_record']
+                    if info['cache_path']:
+                        # Recorded as an output so the manifest keeps it alive and deletes it with the entry.
+                        outputs.append(Path(info['cache_path']))
+                        resize_cache_used.add(info['cache_path'])
+                stats[dataset_prefix][split] += 1
+                throughput['files'] += 1
+                throughput[method] += 1
+                throughput['bytes_copied' if method == 'copy' else 'bytes_avoided'] += size
+            else:
                 print(f"     ⚠ No image found for {label_file}")
 
+        if manifest:
+            signatures = {role: file_signature(path) for role, path in sources.items() if path}
+            manifest.update(key, signatures, outputs)
+
+# --- Parallel, link-based merge engine ---
+
+def build_image_index(image_dir):
+    """Scans an images folder once and maps each stem to its file name and extension.
+
+    When a stem exists with several extensions the one earliest in IMAGE_EXTENSIONS wins,
+    matching the probe order of the serial merge.
+    """
+    index = {}
+    priority = {ext: i for i, ext in enumerate(IMAGE_EXTENSIONS)}
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            ext = ext.lower()
+            if ext not in priority:
+                continue
+            current = index.get(stem)
+            if current is None or priority[ext] < priority[current[1]]:
+                index[stem] = (entry.name, ext)
+    return index
+
+def _reflink(src, dst):
+    """Creates a copy-on-write clone (Btrfs/XFS/APFS-style). Raises OSError if unsupported."""
+    if not sys.platform.startswith('linux'):
+        raise OSError("reflinks are only supported on Linux here")
+    import fcntl
+    FICLONE = 0x40049409
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+
+def materialize_image(src, dst, link_mode=LINK_MODE):
+    """Places src at dst using link_mode, falling back to a full copy. Returns the method used.
+
+    link_mode may also be a list of modes, tried in order before copying.
+    """
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    for mode in ([link_mode] if isinstance(link_mode, str) else link_mode):
+        try:
+            if mode == 'hardlink':
+                os.link(src, dst)
+                return 'hardlink'
+            if mode == 'reflink':
+                _reflink(src, dst)
+                return 'reflink'
+            if mode == 'symlink':
+                os.symlink(os.path.abspath(src), dst)
+                return 'symlink'
+        except OSError:
+            continue
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+def resize_settings():
+    """The resize stage's settings as a plain dict for worker jobs, or None when it's off."""
+    if not RESIZE_MAX_SIDE:
+        return None
+    return {'max_side': RESIZE_MAX_SIDE, 'format': RESIZE_FORMAT, 'quality': RESIZE_QUALITY,
+            'cache_dir': str(output_path / RESIZE_CACHE_DIR)}
+
+def load_image_sizes():
+    """Loads the cached source image dimensions from the resize cache folder."""
+    image_sizes.clear()
+    try:
+        with open(output_path / RESIZE_CACHE_DIR / 'sizes.json', 'r') as f:
+            image_sizes.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+def save_image_sizes():
+    cache_dir = output_path / RESIZE_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / 'sizes.json.tmp', 'w') as f:
+        json.dump(image_sizes, f)
+    os.replace(cache_dir / 'sizes.json.tmp', cache_dir / 'sizes.json')
+
+def prune_resize_cache(manifest=None):
+    """Deletes resize cache files that no merged image uses any more. Returns (files, bytes) removed.
+
+    In use are the cache files placed during this run plus, with a manifest, the ones
+    recorded as outputs of unchanged entries. Merged images are hard links or copies of
+    the cache files, so removing a cache file never breaks the dataset. Size records of
+    source images that no longer exist are dropped as well.
+    """
+    cache_dir = output_path / RESIZE_CACHE_DIR
+    if not cache_dir.is_dir():
+        return 0, 0
+    in_use = {os.path.normcase(os.path.abspath(p)) for p in resize_cache_used}
+    if manifest:
+        in_use.update(os.path.normcase(os.path.abspath(p)) for p in manifest.outputs())
+    removed = removed_bytes = 0
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name in ('sizes.json', 'sizes.json.tmp'):
+                continue
+            if os.path.normcase(os.path.abspath(entry.path)) not in in_use:
+                removed_bytes += entry.stat().st_size
+                os.remove(entry.path)
+                removed += 1
+    for path in [path for path in image_sizes if not os.path.exists(path)]:
+        del image_sizes[path]
+    return removed, removed_bytes
+
+def _encode_params(fmt, quality):
+    if fmt in ('.jpg', '.jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if fmt == '.webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    if fmt == '.png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    return []
+
+def resize_image_cached(src, resize, size_record=None):
+    """Resizes and re-encodes src into the resize cache unless a cached result exists.
+
+    Returns (path to place in the dataset, its extension, info). The path is src itself
+    when the image already fits and has the target format. info holds the source and
+    output bytes, whether the image was encoded now or came from the cache, and the
+    [bytes, mtime_ns, width, height] record for the size cache.
+    """
+    src = Path(src)
+    st = src.stat()
+    ext = src.suffix.lower()
+    fmt = resize['format']
+    if size_record and size_record[:2] == [st.st_size, st.st_mtime_ns]:
+        size = tuple(size_record[2:])
+    else:
+        size = read_image_size(src)
+    info = {'bytes_in': st.st_size, 'bytes_out': st.st_size, 'encoded': False, 'cached': False,
+            'size_record': [st.st_size, st.st_mtime_ns, *size] if size else None}
+
+    same_format = ext == fmt or {ext, fmt} <= {'.jpg', '.jpeg'}
+    if size and max(size) <= resize['max_side'] and same_format:
+        return src, ext, info
+
+    key = f"{src.resolve()}|{st.st_size}|{st.st_mtime_ns}|{resize['max_side']}|{fmt}|{resize['quality']}"
+    cached = Path(resize['cache_dir']) / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}{fmt}"
+    if cached.exists():
+        info.update(bytes_out=cached.stat().st_size, cached=True)
+        return cached, fmt, info
+
+    # Big JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale, which is much faster than a full decode.
+    flag = cv2.IMREAD_COLOR
+    if size and ext in ('.jpg', '.jpeg'):
+        for reduction, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                        (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if max(size) / reduction >= resize['max_side']:
+                flag = reduced_flag
+                break
+    image = cv2.imdecode(np.fromfile(str(src), np.uint8), flag)
+    if image is None:
+        return src, ext, info
+    height, width = image.shape[:2]
+    if info['size_record'] is None:
+        info['size_record'] = [st.st_size, st.st_mtime_ns, width, height]
+    scale = resize['max_side'] / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(fmt, image, _encode_params(fmt, resize['quality']))
+    if not ok:
+        return src, ext, info
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+    encoded.tofile(str(tmp_path))
+    os.replace(tmp_path, cached)
+    info.update(bytes_out=len(encoded), encoded=True)
+    return cached, fmt, info
+
+def place_image(image_path, dest_img_dir, name_stem, ext, link_mode, resize=None, size_record=None):
+    """Materializes one merged image, through the resize stage when it's on.
+
+    Returns (dest path, link method, source bytes, resize info or None). When the image
+    comes from the resize cache, info['cache_path'] is that cache file.
+    """
+    info = None
+    src = image_path
+    if resize:
+        src, ext, info = resize_image_cached(image_path, resize, size_record)
+        info['cache_path'] = str(src) if src != image_path else None
+        if src != image_path:
+            # Cache files are private to the output folder, so linking them is always safe.
+            link_mode = ['hardlink', 'reflink']
+    dest_image = Path(dest_img_dir) / f"{name_stem}{ext}"
+    method = materialize_image(src, dest_image, link_mode)
+    return dest_image, method, os.path.getsize(src), info
+
+def _count_resize(counters, info):
+    """Adds one image's resize info to a throughput-style counter dict."""
+    counters['resize_bytes_before'] += info['bytes_in']
+    counters['resize_bytes_after'] += info['bytes_out']
+    counters['resize_encoded'] += info['encoded']
+    counters['resize_cached'] += info['cached']
+    counters['resize_kept'] += not (info['encoded'] or info['cached'])
+
+def _remap_chunk(job):
+    """Worker: remaps a chunk of label files and materializes their images.
+
+    Runs in a separate process, so it only returns plain counters and warnings. When
+    `track` is set it also returns each label's source signatures and outputs for the
+    manifest, so hashing happens in the workers rather than in the parent.
+    """
+    (label_dir, image_dir, dest_lbl_dir, dest_img_dir, dataset_prefix, old_classes, items, link_mode, track,
+     resize, size_records) = job
+    result = {'copied': 0, 'bytes_avoided': 0, 'bytes_copied': 0, 'warnings': [],
+              'methods': defaultdict(int), 'records': [], 'resize': defaultdict(int), 'sizes': {},
+              'cache_files': []}
+
+    for label_file, image_entry in items:
+        label_path = Path(label_dir) / label_file
+        image_path = Path(image_dir) / image_entry[0] if image_entry else None
+        outputs = []
+        new_labels, warnings = remap_label_file(label_path, old_classes)
+        result['warnings'].extend(warnings)
+
+        if new_labels:
+            stem = Path(label_file).stem
+            dest_label = Path(dest_lbl_dir) / f"{dataset_prefix}_{label_file}"
+            with open(dest_label, 'w') as f:
+                f.write('\n'.join(new_labels))
+            outputs.append(str(dest_label))
+
+            if image_path is None:
+                result['warnings'].append(f"     ⚠ No image found for {label_file}")
+            else:
+                dest_image, method, size, info = place_image(image_path, dest_img_dir, f"{dataset_prefix}_{stem}",
+                                                             image_entry[1], link_mode, resize,
+                                                             size_records.get(str(image_path)))
+                outputs.append(str(dest_image))
+                if info:
+                    _count_resize(result['resize'], info)
+                    if info['size_record']:
+                        result['sizes'][str(image_path)] = info['size_record']
+                    if info['cache_path']:
+                        outputs.append(info['cache_path'])
+                        result['cache_files'].append(info['cache_path'])
+                if method == 'copy':
+                    result['bytes_copied'] += size
+                else:
+                    result['bytes_avoided'] += size
+                result['methods'][method] += 1
+                result['copied'] += 1
+
+        if track:
+            signatures = {'label': file_signature(label_path)}
+            if image_path:
+                signatures['image'] = file_signature(image_path)
+            result['records'].append((label_file, signatures, outputs))
+
+    result['methods'] = dict(result['methods'])
+    result['resize'] = dict(result['resize'])
+    return result
+
+def remap_and_copy_files_parallel(original_path, split, old_classes, executor, link_mode=LINK_MODE, manifest=None,
+                                  skip_stems=None, resize=None):
+    """Same output as remap_and_copy_files, but indexed once per split and spread over a process pool.
+
+    With `resize` (see resize_settings) the images are also resized and re-encoded in the pool.
+    """
+    image_dir = original_path / split / 'images'
+    label_dir = original_path / split / 'labels'
+
+    if not label_dir.is_dir() or not image_dir.is_dir():
+        print(f"   ⚠ Skipping '{split}' in {original_path.name} (missing dirs).")
+        return
+
+    dest_img_dir = output_path / split / 'images'
+    dest_lbl_dir = output_path / split / 'labels'
+    dest_img_dir.mkdir(parents=True, exist_ok=True)
+    dest_lbl_dir.mkdir(parents=True, exist_ok=True)
+
+    dataset_prefix = original_path.name
+    image_index = build_image_index(image_dir)
+
+    items = []
+    for label_file in os.listdir(label_dir):
+        if not label_file.endswith('.txt'):
+            continue
+        if skip_stems and Path(label_file).stem in skip_stems:
+            continue
+        image_entry = image_index.get(Path(label_file).stem)
+        key = f"{dataset_prefix}/{split}/{label_file}"
+        seen_keys.add(key)
+        if manifest:
+            sources = {'label': label_dir / label_file,
+                       'image': image_dir / image_entry[0] if image_entry else None}
+            if manifest.is_current(key, sources):
+                throughput['unchanged'] += 1
+                continue
+        items.append((label_file, image_entry))
+
+    jobs = []
+    chunk_size = RESIZE_CHUNK_SIZE if resize else CHUNK_SIZE
+    for i in range(0, len(items), chunk_size):
+        chunk = items[i:i + chunk_size]
+        size_records = {}
+        if resize:
+            paths = (str(image_dir / entry[0]) for _, entry in chunk if entry)
+            size_records = {path: image_sizes[path] for path in paths if path in image_sizes}
+        jobs.append((str(label_dir), str(image_dir), str(dest_lbl_dir), str(dest_img_dir), dataset_prefix,
+                     old_classes, chunk, link_mode, manifest is not None, resize, size_records))
+
+    for result in executor.map(_remap_chunk, jobs):
+        image_sizes.update(result['sizes'])
+        resize_cache_used.update(result['cache_files'])
+        for name, count in result['resize'].items():
+            throughput[name] += count
+        for label_file, signatures, outputs in result['records']:
+            manifest.update(f"{dataset_prefix}/{split}/{label_file}", signatures, outputs)
+        for warning in result['warnings']:
+            print(warning)
+        if result['copied']:
+            stats[dataset_prefix][split] += result['copied']
+        throughput['files'] += result['copied']
+        throughput['bytes_avoided'] += result['bytes_avoided']
+        throughput['bytes_copied'] += result['bytes_copied']
+        for method, count in result['methods'].items():
+            throughput[method] += count
+
+def _mergeable_chunk(job):
+    """Worker: (label path, whether it has a row that remaps to a master class) per label file."""
+    label_paths, old_classes = job
+    return [(path, bool(remap_label_file(path, old_classes)[0])) for path in label_paths]
+
+def mergeable_images(dataset_path, split, old_classes, executor=None, cache=None):
+    """{stem: image path} for the images of a split that the merge would copy.
+
+    An image is merged only if its label file has at least one row that remaps to a
+    master class. With `cache` (a HashCache) the answer is reused while the label file
+    and the class mapping are unchanged; the other label files are read in `executor`.
+    """
+    image_dir = dataset_path / split / 'images'
+    label_dir = dataset_path / split / 'labels'
+    if not image_dir.is_dir() or not label_dir.is_dir():
+        return {}
+    image_index = build_image_index(image_dir)
+    mapping = json.dumps([old_classes, master_class_map], sort_keys=True)
+    mapping_key = hashlib.blake2b(mapping.encode(), digest_size=8).hexdigest()
+
+    mergeable = {}
+    todo = []
+    for label_file in sorted(os.listdir(label_dir)):
+        stem, ext = os.path.splitext(label_file)
+        if ext != '.txt' or stem not in image_index:
+            continue
+        label_path = label_dir / label_file
+        value, hit = cache.get(label_path) if cache else (None, False)
+        if hit and value[0] == mapping_key:
+            mergeable[label_path] = value[1]
+        else:
+            todo.append(label_path)
+
+    jobs = [(todo[i:i + CHUNK_SIZE], old_classes) for i in range(0, len(todo), CHUNK_SIZE)]
+    for chunk in (executor.map(_mergeable_chunk, jobs) if executor else map(_mergeable_chunk, jobs)):
+        for label_path, value in chunk:
+            mergeable[label_path] = value
+            if cache:
+                cache.put(label_path, [mapping_key, value])
+
+    return {path.stem: image_dir / image_index[path.stem][0]
+            for path in sorted(mergeable) if mergeable[path]}
+
+def find_duplicate_images(dataset_paths, executor=None, mode=DEDUP_MODE, cross_split=DEDUP_CROSS_SPLIT):
+    """Hashes every image that will be merged and finds near-duplicates across all datasets and splits.
+
+    Writes duplicates.csv (same split) and cross_split_duplicates.csv (e.g. a valid image
+    that is also in train) to the output folder. Returns {(dataset, split): stems to skip}:
+    same-split duplicates when mode is 'drop', cross-split ones only if cross_split is
+    'drop' as well.
+    """
+    output_path.mkdir(parents=True, exist_ok=True)
+    image_paths = {}
+    label_cache = HashCache(output_path / DEDUP_LABELS_NAME)
+    for dataset_path in sorted(dataset_paths):
+        old_classes = get_class_list_from_yaml(dataset_path / 'data.yaml')
+        for split in ['train', 'valid', 'test']:
+            for stem, path in mergeable_images(dataset_path, split, old_classes, executor, label_cache).items():
+                image_paths[(dataset_path.name, split, stem)] = path
+    label_cache.save()
+
+    cache = HashCache(output_path / DEDUP_CACHE_NAME)
+    hashes = compute_hashes(list(image_paths.values()), executor, cache)
+    cache.save()
+    duplicates = find_duplicates({key: hashes[path] for key, path in image_paths.items()}, DEFAULT_MAX_DISTANCE)
+
+    skip = defaultdict(set)
+    counts = defaultdict(int)
+    with open(output_path / 'duplicates.csv', 'w') as same_f, \
+            open(output_path / 'cross_split_duplicates.csv', 'w') as cross_f:
+        same_f.write("duplicate,kept,distance\n")
+        cross_f.write("duplicate,duplicate_split,kept,kept_split,distance\n")
+        for key, (kept_key, distance) in duplicates.items():
+            if key[1] == kept_key[1]:
+                same_f.write(f"{image_paths[key]},{image_paths[kept_key]},{distance}\n")
+                kind, drop = 'same', mode == 'drop'
+            else:
+                cross_f.write(f"{image_paths[key]},{key[1]},{image_paths[kept_key]},{kept_key[1]},{distance}\n")
+                kind, drop = 'cross', mode == 'drop' and cross_split == 'drop'
+            counts[kind] += 1
+            if drop:
+                skip[key[:2]].add(key[2])
+                counts['dropped'] += 1
+                counts['bytes_dropped'] += image_paths[key].stat().st_size
+
+    verb = "Dropping" if mode == 'drop' else "Found"
+    print(f"🔁 {verb} {counts['same']} near-duplicate images within a split out of {len(image_paths)} "
+          f"merged images ({counts['bytes_dropped'] / 1e6:.1f} MB dropped). Details in duplicates.csv")
+    if counts['cross']:
+        action = "dropping them" if mode == 'drop' and cross_split == 'drop' else "kept in both splits"
+        print(f"⚠ {counts['cross']} images are near-duplicates of an image in another split ({action}). "
+              f"Details in cross_split_duplicates.csv")
+    throughput['duplicates'] = counts['dropped']
+    throughput['bytes_deduped'] = counts['bytes_dropped']
+    throughput['cross_split_duplicates'] = counts['cross']
+    return skip
+
+def print_throughput_summary(elapsed):
+    """Prints files/s and how many bytes were linked instead of copied."""
+    files = throughput['files']
+    rate = files / elapsed if elapsed > 0 else 0.0
+    print("\n⚡ Throughput:")
+    print(f"  {files} images in {elapsed:.1f}s ({rate:.1f} files/s)")
+    if throughput['duplicates']:
+        print(f"  Near-duplicates skipped: {throughput['duplicates']} images "
+              f"({throughput['bytes_deduped'] / 1e6:.1f} MB saved)")
+    if throughput['cross_split_duplicates']:
+        print(f"  Cross-split near-duplicates: {throughput['cross_split_duplicates']} "
+              f"(see cross_split_duplicates.csv)")
+    if throughput['unchanged'] or throughput['removed']:
+        print(f"  Unchanged (skipped): {throughput['unchanged']} | removed: {throughput['removed']}")
+    print(f"  Bytes copied: {throughput['bytes_copied'] / 1e6:.1f} MB | "
+          f"bytes avoided via links: {throughput['bytes_avoided'] / 1e6:.1f} MB")
+    methods = {m: throughput[m] for m in ('hardlink', 'reflink', 'symlink', 'copy') if throughput[m]}
+    if methods:
+        print(f"  Methods: {methods}")
+    resized = throughput['resize_encoded'] + throughput['resize_cached'] + throughput['resize_kept']
+    if resized:
+        before, after = throughput['resize_bytes_before'], throughput['resize_bytes_after']
+        print(f"  Resize to {RESIZE_MAX_SIDE}px: {throughput['resize_encoded']} encoded "
+              f"({throughput['resize_encoded'] / elapsed if elapsed > 0 else 0.0:.1f} images/s), "
+              f"{throughput['resize_cached']} from cache, {throughput['resize_kept']} already small enough")
+        print(f"  Image bytes: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+              f"({100 * (1 - after / before) if before else 0.0:.0f}% smaller)")
+
 def create_master_yaml():
     """Creates final master.yaml for YOLO training."""
     yaml_path = output_path / "master.yaml"
@@ -126,9 +688,28 @@ def create_master_yaml():
 if __name__ == '__main__':
     print("🚀 Starting dataset merge + remap...")
 
+    start_time = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=NUM_WORKERS) if PARALLEL_MERGE else None
+    resize = resize_settings()
+    if resize:
+        load_image_sizes()
+    manifest = None
+    if INCREMENTAL:
+        config = {'master_class_list': master_class_list}
+        if resize:
+            config['resize'] = {k: v for k, v in resize.items() if k != 'cache_dir'}
+        manifest = Manifest(output_path / MANIFEST_NAME, config)
+        if manifest.rebuilt:
+            print("ℹ️  Master class list changed since the last run, rebuilding everything.")
+
     # Auto-detect dataset folders inside parent directory
     dataset_paths = [p for p in datasets_parent.iterdir() if p.is_dir()]
 
+    skip_images = {}
+    if DEDUP_MODE:
+        print("\n🔍 Hashing images to find near-duplicates...")
+        skip_images = find_duplicate_images([p for p in dataset_paths if (p / 'data.yaml').exists()], executor)
+
     for dataset_path in dataset_paths:
         yaml_file = dataset_path / 'data.yaml'
 
@@ -143,16 +724,51 @@ if __name__ == '__main__':
             continue
 
         print(f"   Found {len(old_class_list)} classes (sample: {old_class_list[:5]})")
+        if manifest and manifest.sync_scope(dataset_path.name, old_class_list):
+            print("   ℹ️  Class list changed since the last run, re-merging this dataset.")
 
         for split in ['train', 'valid', 'test']:
             print(f"   → Remapping '{split}'...")
-            remap_and_copy_files(dataset_path, split, old_class_list)
+            skip_stems = skip_images.get((dataset_path.name, split))
+            if executor:
+                remap_and_copy_files_parallel(dataset_path, split, old_class_list, executor, manifest=manifest,
+                                              skip_stems=skip_stems, resize=resize)
+            else:
+                remap_and_copy_files(dataset_path, split, old_class_list, manifest=manifest, skip_stems=skip_stems,
+                                     resize=resize)
+            if manifest:
+                manifest.save()
+            if resize:
+                save_image_sizes()
+
+    if executor:
+        executor.shutdown()
+
+    if manifest:
+        throughput['removed'] = manifest.prune(seen_keys)
+        manifest.save()
+
+    pruned, pruned_bytes = prune_resize_cache(manifest)
+    if pruned:
+        print(f"🧹 Removed {pruned} unused resize cache files ({pruned_bytes / 1e6:.1f} MB)")
+    if resize:
+        save_image_sizes()
 
     create_master_yaml()
 
     print("\n✅ All done! Master dataset ready in:", output_path)
 
+    if EXPORT_SHARDS:
+        from shard_export import export_shards
+        print(f"\n📦 Packing shards into {SHARDS_PATH}...")
+        shard_manifest = export_shards(output_path, SHARDS_PATH, SHARD_SIZE_MB, workers=NUM_WORKERS)
+        for split, summary in shard_manifest['splits'].items():
+            print(f"  {split}: {summary['samples']} samples in {len(summary['shards'])} shards "
+                  f"({summary['bytes'] / 1e6:.1f} MB)")
+
     print("\n📊 Summary Report:")
     for ds, splits in stats.items():
         split_counts = {s: c for s, c in splits.items()}
         print(f"  {ds}: {split_counts}")
+
+    print_throughput_summary(time.perf_counter() - start_time)
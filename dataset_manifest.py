@@ -0,0 +1,164 @@
+"""Content-hash manifest that lets the merge and filter scripts run incrementally.
+
+Each output dataset keeps a JSON manifest next to it. For every source label file it
+records the size, mtime and hash of the label and its image, plus the output files
+that were written for it. A rerun only touches entries whose sources changed, and
+entries whose sources disappeared have their outputs removed. The manifest is
+checkpointed while the run progresses, so an interrupted run resumes where it stopped.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+CHECKPOINT_EVERY = 500
+HASH_CHUNK = 1 << 20
+
+
+def file_hash(path):
+    """Returns the BLAKE2b hex digest of a file, read in 1 MB chunks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_signature(path, with_hash=True):
+    """Returns {'size', 'mtime', 'hash'} for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    sig = {'size': st.st_size, 'mtime': st.st_mtime_ns}
+    if with_hash:
+        sig['hash'] = file_hash(path)
+    return sig
+
+
+class Manifest:
+    """Tracks which source files have already been turned into outputs."""
+
+    def __init__(self, path, config):
+        self.path = Path(path)
+        self.config = config
+        self.entries = {}
+        self.scopes = {}
+        self.rebuilt = False
+        self._dirty = 0
+
+        data = None
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not read manifest {self.path}, rebuilding. Details: {e}")
+
+        if data and data.get('version') == MANIFEST_VERSION and data.get('config') == config:
+            self.entries = data.get('entries', {})
+            self.scopes = data.get('scopes', {})
+        else:
+            # No manifest, or the class map changed: every output has to be rebuilt.
+            self.rebuilt = data is not None
+            for entry in data.get('entries', {}).values() if data else []:
+                _remove_outputs(entry.get('outputs', []))
+
+    def sync_scope(self, scope, value):
+        """Drops all entries under `scope/` if the value recorded for it changed.
+
+        Used for settings that only affect part of the output, like a source
+        dataset's own class list. Returns the number of entries invalidated.
+        """
+        if self.scopes.get(scope) == value:
+            return 0
+        prefix = f"{scope}/"
+        stale = [key for key in self.entries if key.startswith(prefix)]
+        for key in stale:
+            self.drop(key)
+        self.scopes[scope] = value
+        self._dirty += 1
+        return len(stale)
+
+    def is_current(self, key, sources):
+        """True if `key` was processed from exactly these sources and its outputs still exist.
+
+        `sources` maps a role ('label', 'image') to a path or None. Size and mtime are
+        checked first; the hash is only recomputed when they differ but the size matches,
+        so a touched-but-unchanged file does not trigger a rebuild.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        recorded = entry['sources']
+        if set(recorded) != {role for role, path in sources.items() if path is not None}:
+            return False
+        for role, path in sources.items():
+            if path is None:
+                continue
+            sig = file_signature(path, with_hash=False)
+            old = recorded[role]
+            if sig is None or sig['size'] != old['size']:
+                return False
+            if sig['mtime'] != old['mtime']:
+                if file_hash(path) != old['hash']:
+                    return False
+                old['mtime'] = sig['mtime']
+                self._dirty += 1
+        return all(os.path.lexists(out) for out in entry['outputs'])
+
+    def update(self, key, signatures, outputs):
+        """Records the source signatures and output paths for `key`.
+
+        Outputs from a previous run that are no longer produced are deleted.
+        """
+        old = self.entries.get(key)
+        outputs = [str(out) for out in outputs]
+        if old:
+            _remove_outputs(set(old['outputs']) - set(outputs))
+        self.entries[key] = {'sources': signatures, 'outputs': outputs}
+        self._dirty += 1
+        if self._dirty >= CHECKPOINT_EVERY:
+            self.save()
+
+    def drop(self, key):
+        """Removes `key` and deletes its outputs."""
+        entry = self.entries.pop(key, None)
+        if entry:
+            _remove_outputs(entry['outputs'])
+            self._dirty += 1
+
+    def prune(self, seen_keys):
+        """Drops every entry not in `seen_keys` (its source was removed). Returns the count."""
+        removed = [key for key in self.entries if key not in seen_keys]
+        for key in removed:
+            self.drop(key)
+        return len(removed)
+
+    def outputs(self):
+        """Every output path recorded in the manifest, as a set of strings."""
+        return {out for entry in self.entries.values() for out in entry['outputs']}
+
+    def save(self):
+        """Writes the manifest atomically so an interrupted run never leaves it half-written."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'config': self.config,
+                'scopes': self.scopes,
+                'entries': self.entries,
+            }, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+
+def _remove_outputs(paths):
+    for out in paths:
+        try:
+            os.unlink(out)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,305 @@
+"""Integrity scan of a YOLO dataset (the master_dataset layout) before training.
+
+Checks every image/label pair of the train/valid/test splits:
+  - images through their headers and trailers only (image_headers.inspect_image), so
+    corrupt, truncated or mislabeled files are found without decoding any pixels
+  - label rows in bulk: each worker tokenizes its chunk of label files into one NumPy
+    array and checks class ids, coordinate ranges and box extents with array ops
+  - images without labels and labels without images
+
+Files are checked in a process pool. Verdicts are cached per file in
+`.validation_cache.json` inside the dataset, keyed by size and mtime, so a re-scan only
+looks at files that changed. The result is a JSON report with counts per problem type,
+the number of affected files and example paths:
+
+    python dataset_validator.py C:\\Users\\HP\\Desktop\\master_dataset --output validation.json
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from image_headers import inspect_image
+
+SPLITS = ['train', 'valid', 'test']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+CACHE_NAME = '.validation_cache.json'
+CACHE_VERSION = 1
+CHUNK_SIZE = 512
+MAX_EXAMPLES = 20
+BOX_TOLERANCE = 1e-3  # slack for rounding in exported coordinates
+
+# Problem type -> (severity, description). 'error' problems break or silently corrupt
+# training; 'warning' problems are legal but usually unintended.
+PROBLEMS = {
+    'missing_image': ('error', "label file without an image"),
+    'empty_image': ('error', "0-byte image file"),
+    'unknown_image_format': ('error', "image is not PNG/JPEG/BMP/GIF/WebP"),
+    'bad_image_header': ('error', "image header has no valid dimensions"),
+    'truncated_image': ('error', "image ends before its end marker or declared length"),
+    'malformed_row': ('error', "label row with fewer than 5 values or non-numeric values"),
+    'class_out_of_range': ('error', "class id is not an integer in [0, nc)"),
+    'coords_out_of_range': ('error', "x, y, w or h outside [0, 1]"),
+    'zero_area_box': ('error', "box with w or h <= 0"),
+    'missing_label': ('warning', "image without a label file (trained as background)"),
+    'empty_label_file': ('warning', "label file without rows (trained as background)"),
+    'box_exceeds_image': ('warning', "box extends past the image border"),
+    'duplicate_row': ('warning', "identical row repeated in a label file"),
+    'polygon_row': ('warning', "row with more than 5 values (segmentation polygon)"),
+    'format_mismatch': ('warning', "file extension doesn't match the image format"),
+}
+IMAGE_PROBLEMS = {'empty_image', 'unknown_image_format', 'bad_image_header', 'truncated_image', 'format_mismatch'}
+EXTENSION_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png', '.bmp': 'bmp', '.webp': 'webp'}
+
+
+# --- Checks (run in worker processes) ---
+
+def check_image(path):
+    """{problem: count} for one image file."""
+    info = inspect_image(path)
+    problems = Counter()
+    if info['problem']:
+        problems[info['problem']] += 1
+    elif info['format'] != EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower()):
+        problems['format_mismatch'] += 1
+    return problems
+
+
+def check_labels(paths, num_classes):
+    """[{problem: count}] for a list of label files, with the row checks done in bulk."""
+    verdicts = [Counter() for _ in paths]
+    rows, row_file = [], []
+    for i, path in enumerate(paths):
+        with open(path, 'r', errors='replace') as f:
+            lines = [line.split() for line in f if line.strip()]
+        if not lines:
+            verdicts[i]['empty_label_file'] += 1
+            continue
+        for parts in lines:
+            if len(parts) < 5:
+                verdicts[i]['malformed_row'] += 1
+                continue
+            if len(parts) > 5:
+                verdicts[i]['polygon_row'] += 1
+            rows.append(parts[:5])
+            row_file.append(i)
+    if not rows:
+        return verdicts
+
+    row_file = np.array(row_file, dtype=np.int64)
+    try:
+        values = np.array(rows, dtype=np.float64)
+    except ValueError:
+        numeric = np.array([_is_numeric(row) for row in rows])
+        for i in row_file[~numeric]:
+            verdicts[i]['malformed_row'] += 1
+        row_file = row_file[numeric]
+        values = np.array([row for row, ok in zip(rows, numeric) if ok], dtype=np.float64).reshape(-1, 5)
+
+    cls, boxes = values[:, 0], values[:, 1:5]
+    x, y, w, h = boxes.T
+    checks = {
+        'class_out_of_range': (cls != np.round(cls)) | (cls < 0) | (cls >= num_classes if num_classes else False),
+        'coords_out_of_range': ((boxes < 0) | (boxes > 1)).any(axis=1),
+        'zero_area_box': (w <= 0) | (h <= 0),
+        'box_exceeds_image': ((x - w / 2 < -BOX_TOLERANCE) | (x + w / 2 > 1 + BOX_TOLERANCE)
+                              | (y - h / 2 < -BOX_TOLERANCE) | (y + h / 2 > 1 + BOX_TOLERANCE)),
+    }
+    # A row repeats if the same (file, row values) pair occurred earlier.
+    _, first = np.unique(np.column_stack([row_file, values]), axis=0, return_index=True)
+    duplicate = np.ones(len(values), dtype=bool)
+    duplicate[first] = False
+    checks['duplicate_row'] = duplicate
+
+    for problem, mask in checks.items():
+        for i, count in enumerate(np.bincount(row_file[mask], minlength=len(paths)).tolist()):
+            if count:
+                verdicts[i][problem] += count
+    return verdicts
+
+
+def _is_numeric(row):
+    try:
+        [float(v) for v in row]
+        return True
+    except ValueError:
+        return False
+
+
+def _check_chunk(job):
+    """Worker: checks a chunk of samples. Returns [(key, {problem: count})]."""
+    samples, num_classes = job
+    label_paths = [sample['label'][0] for sample in samples if sample['label']]
+    label_verdicts = iter(check_labels(label_paths, num_classes))
+    results = []
+    for sample in samples:
+        problems = Counter()
+        if sample['label']:
+            problems.update(next(label_verdicts))
+        else:
+            problems['missing_label'] += 1
+        if sample['image']:
+            problems.update(check_image(sample['image'][0]))
+        else:
+            problems['missing_image'] += 1
+        results.append((sample['key'], dict(problems)))
+    return results
+
+
+# --- Scan ---
+
+def _scan_dir(directory, extensions):
+    """stem -> [path, size, mtime_ns] for the files in directory with the given extensions."""
+    files = {}
+    if not directory.is_dir():
+        return files
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() in extensions and stem not in files:
+                st = entry.stat()
+                files[stem] = [entry.path, st.st_size, st.st_mtime_ns]
+    return files
+
+
+def list_samples(dataset_path, splits=SPLITS):
+    """Every image/label pair (either may be missing) as {'key', 'split', 'image', 'label'}."""
+    samples = []
+    for split in splits:
+        images = _scan_dir(dataset_path / split / 'images', IMAGE_EXTENSIONS)
+        labels = _scan_dir(dataset_path / split / 'labels', ('.txt',))
+        for stem in sorted(images.keys() | labels.keys()):
+            samples.append({'key': f"{split}/{stem}", 'split': split,
+                            'image': images.get(stem), 'label': labels.get(stem)})
+    return samples
+
+
+def read_num_classes(dataset_path, yaml_filename='master.yaml'):
+    """Number of classes in the dataset YAML, or 0 (class ids then only need to be >= 0)."""
+    try:
+        with open(dataset_path / yaml_filename, 'r') as f:
+            names = (yaml.safe_load(f) or {}).get('names', [])
+    except (OSError, yaml.YAMLError):
+        return 0
+    return max(names) + 1 if isinstance(names, dict) and names else len(names)
+
+
+def _signature(sample):
+    return [sample['image'][1:] if sample['image'] else None, sample['label'][1:] if sample['label'] else None]
+
+
+def validate_dataset(dataset_path, yaml_filename='master.yaml', splits=SPLITS, workers=None, use_cache=True):
+    """Scans the dataset and returns the report dict (see build_report)."""
+    dataset_path = Path(dataset_path)
+    num_classes = read_num_classes(dataset_path, yaml_filename)
+    start = time.perf_counter()
+    samples = list_samples(dataset_path, splits)
+
+    cache_path = dataset_path / CACHE_NAME
+    cached = {}
+    if use_cache:
+        try:
+            with open(cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION and data.get('num_classes') == num_classes:
+                cached = data['entries']
+        except (OSError, ValueError):
+            pass
+
+    verdicts, todo = {}, []
+    for sample in samples:
+        entry = cached.get(sample['key'])
+        if entry and entry['signature'] == _signature(sample):
+            verdicts[sample['key']] = entry['problems']
+        else:
+            todo.append(sample)
+
+    jobs = [(todo[i:i + CHUNK_SIZE], num_classes) for i in range(0, len(todo), CHUNK_SIZE)]
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(_check_chunk, jobs):
+                verdicts.update(results)
+    else:
+        for job in jobs:
+            verdicts.update(_check_chunk(job))
+
+    if use_cache:
+        entries = {s['key']: {'signature': _signature(s), 'problems': verdicts[s['key']]} for s in samples}
+        tmp_path = cache_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'num_classes': num_classes, 'entries': entries}, f)
+        os.replace(tmp_path, cache_path)
+
+    report = build_report(dataset_path, samples, verdicts, num_classes)
+    report['scan'] = {'samples': len(samples), 'checked': len(todo), 'from_cache': len(samples) - len(todo),
+                      'elapsed_s': round(time.perf_counter() - start, 3)}
+    return report
+
+
+def build_report(dataset_path, samples, verdicts, num_classes):
+    """Counts per problem type (overall and per split), affected files and example paths."""
+    counts, files, per_split = Counter(), Counter(), defaultdict(Counter)
+    examples = defaultdict(list)
+    for sample in samples:
+        problems = verdicts[sample['key']]
+        for problem, count in problems.items():
+            counts[problem] += count
+            files[problem] += 1
+            per_split[sample['split']][problem] += count
+            if len(examples[problem]) < MAX_EXAMPLES:
+                sample_file = sample['image'] if problem in IMAGE_PROBLEMS else (sample['label'] or sample['image'])
+                examples[problem].append(sample_file[0])
+
+    errors = sum(count for problem, count in counts.items() if PROBLEMS[problem][0] == 'error')
+    return {
+        'dataset': str(dataset_path), 'num_classes': num_classes,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'ok': errors == 0, 'errors': errors,
+        'warnings': sum(counts.values()) - errors,
+        'counts': {problem: counts[problem] for problem in PROBLEMS if counts[problem]},
+        'files_affected': {problem: files[problem] for problem in PROBLEMS if files[problem]},
+        'per_split': {split: dict(per_split[split]) for split in SPLITS if split in per_split},
+        'problem_types': {problem: {'severity': severity, 'description': description}
+                          for problem, (severity, description) in PROBLEMS.items()},
+        'examples': dict(examples),
+    }
+
+
+def print_report(report):
+    scan = report['scan']
+    print(f"🔎 {scan['samples']} samples in {scan['elapsed_s']:.1f}s "
+          f"({scan['checked']} checked, {scan['from_cache']} unchanged since the last scan)")
+    if not report['counts']:
+        print("✅ No problems found.")
+        return
+    for problem, count in report['counts'].items():
+        severity = report['problem_types'][problem]['severity']
+        icon = '❌' if severity == 'error' else '⚠️ '
+        print(f"  {icon} {problem:<22} {count:>7} in {report['files_affected'][problem]:>6} files "
+              f"| e.g. {report['examples'][problem][0]}")
+    print(f"\n{'❌' if report['errors'] else '✅'} {report['errors']} errors, {report['warnings']} warnings")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check a YOLO dataset for corrupt images and bad labels.")
+    parser.add_argument('dataset', help="Dataset folder with train/valid/test splits.")
+    parser.add_argument('--yaml', default='master.yaml', help="Dataset YAML inside the folder (for the class count).")
+    parser.add_argument('--output', help="Write the JSON report here.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true', help="Re-check every file and don't update the cache.")
+    args = parser.parse_args()
+
+    report = validate_dataset(args.dataset, args.yaml, workers=args.workers, use_cache=not args.no_cache)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    raise SystemExit(1 if report['errors'] else 0)
@@ -0,0 +1,100 @@
+"""Shared post-processing for YOLOv8 results used by the app and the live scripts.
+
+Each result's boxes are pulled off the device once as an (N, 6) NumPy array
+[x1, y1, x2, y2, confidence, class_id]. Confidence and class filtering are boolean
+masks over that array, with class membership checked against a precomputed
+per-class-id mask instead of a list of names. Label text sizes are cached, since the
+same '<class> <conf>' strings come back frame after frame. Tiled inference merges
+per-tile boxes with the class-aware non_max_suppression below.
+"""
+
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+def result_to_array(result):
+    """Returns one result's boxes as a float32 (N, 6) array: x1, y1, x2, y2, conf, cls."""
+    data = result.boxes.data
+    if hasattr(data, 'cpu'):
+        data = data.cpu().numpy()
+    return np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+
+def results_to_array(results):
+    """Concatenates the boxes of every result in `results` into one (N, 6) array."""
+    arrays = [result_to_array(r) for r in results]
+    return np.concatenate(arrays) if arrays else EMPTY_DETECTIONS
+
+
+def class_mask(names, allowed_names):
+    """Boolean array indexed by class id, True for ids whose name is in allowed_names.
+
+    `names` is the model's {id: name} dict (or a list of names).
+    """
+    if not isinstance(names, dict):
+        names = dict(enumerate(names))
+    allowed = set(allowed_names)
+    mask = np.zeros(max(names) + 1 if names else 0, dtype=bool)
+    for cls_id, name in names.items():
+        mask[cls_id] = name in allowed
+    return mask
+
+
+def filter_detections(detections, confidence_threshold, allowed_mask=None):
+    """Keeps rows with confidence above the threshold and (optionally) an allowed class id."""
+    keep = detections[:, 4] > confidence_threshold
+    if allowed_mask is not None and len(detections):
+        cls_ids = detections[:, 5].astype(np.int64)
+        in_range = (cls_ids >= 0) & (cls_ids < len(allowed_mask))
+        keep &= in_range & allowed_mask[np.clip(cls_ids, 0, max(len(allowed_mask) - 1, 0))]
+    return detections[keep]
+
+
+def iter_detections(detections):
+    """Yields (x1, y1, x2, y2, confidence, cls_id) with int coordinates, converted in one go."""
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    confidences = detections[:, 4].tolist()
+    cls_ids = detections[:, 5].astype(np.int32).tolist()
+    for (x1, y1, x2, y2), confidence, cls_id in zip(boxes, confidences, cls_ids):
+        yield x1, y1, x2, y2, confidence, cls_id
+
+
+@lru_cache(maxsize=8192)
+def text_size(label, font_face, font_scale, thickness):
+    """Cached cv2.getTextSize. There are only ~100 confidence strings per class, so hits dominate."""
+    return cv2.getTextSize(label, font_face, font_scale, thickness)
+
+
+def non_max_suppression(detections, threshold=0.5, metric='iou'):
+    """Class-aware greedy NMS over an (N, 6) array, highest confidence first.
+
+    metric 'iou' is the usual intersection over union; 'ios' divides by the smaller box
+    instead, so a box cut off at a tile edge is suppressed by the full box it belongs to.
+    """
+    if len(detections) < 2:
+        return detections
+    order = np.argsort(-detections[:, 4], kind='stable')
+    detections = detections[order]
+    x1, y1, x2, y2 = (detections[:, i] for i in range(4))
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    cls_ids = detections[:, 5]
+
+    keep = []
+    remaining = np.arange(len(detections))
+    while len(remaining):
+        i, rest = remaining[0], remaining[1:]
+        keep.append(i)
+        w = np.maximum(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0)
+        h = np.maximum(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0)
+        inter = w * h
+        if metric == 'ios':
+            overlap = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        else:
+            overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        overlap[cls_ids[rest] != cls_ids[i]] = 0
+        remaining = rest[overlap <= threshold]
+    return detections[np.array(keep, dtype=np.int64)]
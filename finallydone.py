@@ -1,9 +1,17 @@
+import os
+import argparse
 import cv2
-from ultralytics import YOLO
 import numpy as np
 
+from live_pipeline import PipelineRunner, open_source, print_summary
+from latency_metrics import Metrics, DEFAULT_PORT
+from inference_backend import load_backend
+from tracking import DetectThenTrack, draw_track_ids, DIFF_THRESHOLD
+from detection_postprocess import results_to_array, filter_detections, class_mask, iter_detections, text_size
 
-model = YOLO('DOG.pt')
+
+# DOG_BACKEND picks the inference backend: torch, onnx, onnx-int8, openvino or openvino-int8.
+model = load_backend('DOG.pt', os.environ.get('DOG_BACKEND', 'torch'))
 CONFIDENCE_THRESHOLD = 0.6
 HIGH_CONFIDENCE_THRESHOLD = 0.81
 HIGH_ACCURACY_CLASSES = [
@@ -24,58 +32,115 @@ HIGH_ACCURACY_CLASSES = [
 ]
 np.random.seed(42)
 colors = [np.random.randint(0, 255, size=3).tolist() for _ in range(len(model.names))]
+allowed_classes = class_mask(model.names, HIGH_ACCURACY_CLASSES)
+metrics = Metrics(enabled=False)
+
+
+def draw_detections(frame, results):
+    """Draws the filtered detections onto frame in place and returns it."""
+    with metrics.stage('boxes'):
+        detections = filter_detections(results_to_array(results), CONFIDENCE_THRESHOLD, allowed_classes)
+    with metrics.stage('draw'):
+        _draw_boxes(frame, detections)
+    return frame
+
+
+def _draw_boxes(frame, detections):
+    for x1, y1, x2, y2, confidence, cls_id in iter_detections(detections):
+        class_name = model.names[cls_id]
+        color = colors[cls_id]
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+
+        label = f'{class_name} {confidence:.2f}'
+        (text_width, text_height), baseline = text_size(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+
+        # Position for the background rectangle of the label
+        label_bg_x2 = x1 + text_width + 10
+        label_bg_y2 = y1 + text_height + baseline + 10
+
+        # Position for the text itself
+        text_x = x1 + 5
+        text_y = y1 + text_height + 5
+
+        if confidence > HIGH_CONFIDENCE_THRESHOLD:
+
+            cv2.rectangle(frame, (x1, y1), (label_bg_x2, label_bg_y2), (255, 255, 255), -1)
+            cv2.putText(frame, label, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+        else:
+
+            cv2.rectangle(frame, (x1, y1), (label_bg_x2, label_bg_y2), color, -1)
+            cv2.putText(frame, label, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+
+def run_inference(frame):
+    results = model(frame, verbose=False)
+    metrics.record_model_speed(results)
+    return results
+
+
+def detect_filtered(frame):
+    return filter_detections(results_to_array(run_inference(frame)), CONFIDENCE_THRESHOLD, allowed_classes)
+
+
+def draw_tracks(frame, tracked):
+    """Render step for tracking mode: tracked is the (detections, ids) pair from DetectThenTrack.update."""
+    detections, ids = tracked
+    with metrics.stage('draw'):
+        _draw_boxes(frame, detections)
+        draw_track_ids(frame, detections, ids)
+    return frame
+
 
 # --- Main Logic ---
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
-
-while True:
-    success, frame = cap.read()
-    if success:
-        results = model(frame, stream=True, verbose=False)
-
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                confidence = box.conf[0]
-                cls_id = int(box.cls[0])
-                class_name = model.names[cls_id]
-
-                if class_name in HIGH_ACCURACY_CLASSES and confidence > CONFIDENCE_THRESHOLD:
-                    color = colors[cls_id]
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    
-
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-
-                    label = f'{class_name} {confidence:.2f}'
-                    (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-                    
-                    # Position for the background rectangle of the label
-                    label_bg_x2 = x1 + text_width + 10
-                    label_bg_y2 = y1 + text_height + baseline + 10
-                    
-                    # Position for the text itself
-                    text_x = x1 + 5
-                    text_y = y1 + text_height + 5
-
-                    if confidence > HIGH_CONFIDENCE_THRESHOLD:
-
-                        cv2.rectangle(frame, (x1, y1), (label_bg_x2, label_bg_y2), (255, 255, 255), -1)
-                        cv2.putText(frame, label, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
-                    else:
-
-                        cv2.rectangle(frame, (x1, y1), (label_bg_x2, label_bg_y2), color, -1)
-                        cv2.putText(frame, label, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-        cv2.imshow("YOLOv8 Live Detection (Filtered)", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
-    else:
-        break
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Live YOLOv8 detection with a threaded capture/inference/render pipeline.")
+    parser.add_argument('--source', default='0', help="Camera index, video file path, or 'synthetic'.")
+    parser.add_argument('--headless', action='store_true', help="Don't open a window (for benchmarking).")
+    parser.add_argument('--max-frames', type=int, default=None, help="Stop after rendering this many frames.")
+    parser.add_argument('--no-pace', action='store_true',
+                        help="Read video files/synthetic frames as fast as possible instead of at their frame rate.")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Record per-stage latency histograms and overlay them on the window.")
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_PORT, default=None,
+                        help=f"Serve Prometheus metrics on this local port (default {DEFAULT_PORT}). Implies --metrics.")
+    parser.add_argument('--metrics-json', default=None, help="Write the final metrics to this JSON file. Implies --metrics.")
+    parser.add_argument('--track-every', type=int, default=None, metavar='N',
+                        help="Run the detector every N frames and track boxes with optical flow in between.")
+    parser.add_argument('--diff-threshold', type=float, default=DIFF_THRESHOLD,
+                        help="Mean pixel change (0-255) that triggers an early detector run in tracking mode; 0 disables.")
+    args = parser.parse_args()
+
+    metrics.enabled = args.metrics or args.metrics_port is not None or args.metrics_json is not None
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+        print(f"📈 Prometheus metrics at http://127.0.0.1:{args.metrics_port}/metrics")
 
-cap.release()
-cv2.destroyAllWindows()
+    cap = open_source(args.source, pace=not args.no_pace)
+    if not cap.isOpened():
+        print("Error: Could not open webcam.")
+        exit()
+
+    tracker = None
+    if args.track_every:
+        tracker = DetectThenTrack(detect_filtered, detect_every=args.track_every, diff_threshold=args.diff_threshold)
+        runner = PipelineRunner(cap, tracker.update, draw_tracks, display=not args.headless,
+                                window_name="YOLOv8 Live Detection (Tracked)", metrics=metrics)
+    else:
+        runner = PipelineRunner(cap, run_inference, draw_detections, display=not args.headless,
+                                window_name="YOLOv8 Live Detection (Filtered)", metrics=metrics)
+    print_summary(runner.run(max_frames=args.max_frames))
+    if tracker is not None:
+        s = tracker.stats()
+        print(f"\n🎯 Detector ran on {s['detector_runs']}/{s['frames']} frames (duty cycle {s['duty_cycle']:.0%}, "
+              f"{s['gate_fires']} early runs from scene changes)")
+        print(f"   {s['detect_ms']:.1f} ms/detection vs {s['track_ms']:.1f} ms/tracked frame -> "
+              f"{s['fps']:.1f} FPS vs {s['detector_only_fps']:.1f} detecting every frame (x{s['fps_gain']})")
+        print("   Distinct objects: " + (", ".join(f"{model.names[c]}: {n}" for c, n in s['distinct'].items()) or "none"))
+    if metrics.enabled:
+        print("\n⏱  Stage latencies (p50 / p95 / p99 ms):")
+        for stage, s in metrics.snapshot()['stages'].items():
+            print(f"  - {stage:<10}: {s['p50_ms']:7.2f} / {s['p95_ms']:7.2f} / {s['p99_ms']:7.2f}")
+    if args.metrics_json:
+        metrics.dump_json(args.metrics_json)
+        print(f"📄 Metrics written to {args.metrics_json}")
@@ -0,0 +1,138 @@
+"""Near-duplicate image detection for the dataset merge.
+
+Every image gets a 64-bit difference hash (dHash) computed from a 1/8-scale grayscale
+decode, in a process pool. Hashes are cached per file (keyed by path, size and mtime)
+so reruns only hash new or changed images.
+
+Lookups use multi-index hashing instead of comparing every pair: the 64 bits are split
+into `max_distance + 1` bands, and by the pigeonhole principle two hashes within
+`max_distance` bits of each other must agree exactly on at least one band. Only images
+sharing a band bucket are compared.
+"""
+
+import os
+import json
+from pathlib import Path
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 8
+DEFAULT_MAX_DISTANCE = 5
+CHUNK_SIZE = 128
+
+
+def dhash(image_path, hash_size=HASH_SIZE):
+    """Returns the dHash of an image as an int, or None if it cannot be decoded."""
+    image = cv2.imread(str(image_path), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        return None
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _hash_chunk(paths):
+    return [(path, dhash(path)) for path in paths]
+
+
+class HashCache:
+    """JSON cache of {path: [size, mtime_ns, hash]}."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, image_path):
+        entry = self.entries.get(str(image_path))
+        if entry is None:
+            return None, False
+        st = os.stat(image_path)
+        if entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+            return None, False
+        return entry[2], True
+
+    def put(self, image_path, value):
+        st = os.stat(image_path)
+        self.entries[str(image_path)] = [st.st_size, st.st_mtime_ns, value]
+
+    def save(self):
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def compute_hashes(image_paths, executor=None, cache=None):
+    """Returns {path: hash or None}, hashing uncached images in `executor` if given."""
+    hashes = {}
+    todo = []
+    for path in image_paths:
+        value, hit = cache.get(path) if cache else (None, False)
+        if hit:
+            hashes[path] = value
+        else:
+            todo.append(path)
+
+    chunks = [todo[i:i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+    results = executor.map(_hash_chunk, chunks) if executor else map(_hash_chunk, chunks)
+    for chunk in results:
+        for path, value in chunk:
+            hashes[path] = value
+            if cache:
+                cache.put(path, value)
+    return hashes
+
+
+class HammingIndex:
+    """Multi-index hash table answering 'is there a stored hash within max_distance bits?'."""
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, bits=HASH_SIZE * HASH_SIZE):
+        num_bands = max_distance + 1
+        self.max_distance = max_distance
+        edges = [round(i * bits / num_bands) for i in range(num_bands + 1)]
+        self.bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self.buckets = [defaultdict(list) for _ in self.bands]
+
+    def query(self, value):
+        """Returns (key, distance) of the closest stored hash within range, or None."""
+        best = None
+        seen = set()
+        for band, (shift, mask) in enumerate(self.bands):
+            for key, other in self.buckets[band].get((value >> shift) & mask, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                distance = bin(value ^ other).count('1')
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (key, distance)
+        return best
+
+    def add(self, key, value):
+        for band, (shift, mask) in enumerate(self.bands):
+            self.buckets[band][(value >> shift) & mask].append((key, value))
+
+
+def find_duplicates(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """Greedily keeps the first image of every near-duplicate group.
+
+    `hashes` is an ordered mapping {key: hash}. Returns {duplicate_key: (kept_key, distance)}.
+    """
+    index = HammingIndex(max_distance)
+    duplicates = {}
+    for key, value in hashes.items():
+        if value is None:
+            continue
+        match = index.query(value)
+        if match:
+            duplicates[key] = match
+        else:
+            index.add(key, value)
+    return duplicates
@@ -0,0 +1,158 @@
+"""Image dimensions and integrity checks from file headers, without decoding the pixels.
+
+Reads only the few bytes that hold the width and height of PNG, JPEG, BMP, GIF,
+WebP and TIFF files (for JPEG, the segment headers up to the first frame header; for
+TIFF, the first image directory), plus the last bytes of the file to spot truncated
+downloads.
+"""
+
+import os
+import struct
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+TIFF_WIDTH_TAG, TIFF_HEIGHT_TAG = 256, 257
+TIFF_INT_TYPES = {3: 'H', 4: 'I', 16: 'Q'}  # SHORT, LONG, LONG8
+
+
+def _jpeg_size(f):
+    """Walks JPEG segments from after SOI to the first SOF. Returns (w, h) or None."""
+    f.seek(2)
+    while True:
+        if f.read(1) != b'\xff':
+            return None  # not at a marker: corrupt or truncated stream
+        marker = f.read(1)
+        while marker == b'\xff':  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            if marker == 0xD9:
+                return None
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def _tiff_size(f, head):
+    """Reads ImageWidth/ImageLength from the first IFD of a classic or Big TIFF. Returns (w, h) or None."""
+    order = '<' if head[:2] == b'II' else '>'
+    big = struct.unpack(order + 'H', head[2:4])[0] == 43
+    if big:
+        ifd_offset = struct.unpack(order + 'Q', head[8:16])[0]
+        count_fmt, entry_size, value_size = 'Q', 20, 8
+    else:
+        ifd_offset = struct.unpack(order + 'I', head[4:8])[0]
+        count_fmt, entry_size, value_size = 'H', 12, 4
+    f.seek(ifd_offset)
+    count_bytes = f.read(struct.calcsize(count_fmt))
+    if len(count_bytes) < struct.calcsize(count_fmt):
+        return None
+    count = struct.unpack(order + count_fmt, count_bytes)[0]
+    entries = f.read(count * entry_size)
+    size = {}
+    for i in range(0, len(entries) - entry_size + 1, entry_size):
+        tag, value_type = struct.unpack(order + 'HH', entries[i:i + 4])
+        if tag in (TIFF_WIDTH_TAG, TIFF_HEIGHT_TAG) and value_type in TIFF_INT_TYPES:
+            value = entries[i + entry_size - value_size:i + entry_size]
+            fmt = TIFF_INT_TYPES[value_type]
+            size[tag] = struct.unpack(order + fmt, value[:struct.calcsize(fmt)])[0]
+    if TIFF_WIDTH_TAG in size and TIFF_HEIGHT_TAG in size:
+        return size[TIFF_WIDTH_TAG], size[TIFF_HEIGHT_TAG]
+    return None
+
+
+def read_image_size(path):
+    """Returns (width, height) read from the header of an image file, or None if unknown."""
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR' and len(head) >= 24:
+            return struct.unpack('>II', head[16:24])
+        if head[:2] == b'\xff\xd8':
+            return _jpeg_size(f)
+        if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+            return struct.unpack('<HH', head[6:10])
+        if head[:2] == b'BM' and len(head) >= 26:
+            if struct.unpack('<I', head[14:18])[0] == 12:  # OS/2 BITMAPCOREHEADER
+                return struct.unpack('<HH', head[18:22])
+            width, height = struct.unpack('<ii', head[18:26])
+            return abs(width), abs(height)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+            chunk = head[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b'VP8L':
+                bits = int.from_bytes(head[21:25], 'little')
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8X':
+                return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+        if head[:4] in (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+') and len(head) >= 16:
+            return _tiff_size(f, head)
+    return None
+
+
+def _image_format(head):
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if head[:2] == b'\xff\xd8':
+        return 'jpeg'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:2] == b'BM':
+        return 'bmp'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def inspect_image(path):
+    """Checks an image's header and trailer without decoding it.
+
+    Returns {'format', 'size', 'problem'}: problem is None, 'empty_image',
+    'unknown_image_format', 'bad_image_header' (no readable dimensions or a zero
+    dimension) or 'truncated_image' (the file ends before its format's end marker or
+    declared length).
+    """
+    file_size = os.path.getsize(path)
+    result = {'format': None, 'size': None, 'problem': None}
+    if file_size == 0:
+        result['problem'] = 'empty_image'
+        return result
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        f.seek(max(0, file_size - 16))
+        tail = f.read()
+    result['format'] = fmt = _image_format(head)
+    if fmt is None:
+        result['problem'] = 'unknown_image_format'
+        return result
+    size = read_image_size(path)
+    result['size'] = list(size) if size else None
+    if not size or not size[0] or not size[1]:
+        result['problem'] = 'bad_image_header'
+        return result
+
+    if fmt == 'jpeg':
+        complete = tail.rstrip(b'\x00').endswith(b'\xff\xd9')  # some encoders pad after EOI
+    elif fmt == 'png':
+        complete = tail.endswith(b'IEND\xaeB`\x82')
+    elif fmt == 'gif':
+        complete = tail.rstrip(b'\x00').endswith(b'\x3b')
+    elif fmt == 'bmp':
+        complete = file_size >= struct.unpack('<I', head[2:6])[0]
+    else:
+        complete = file_size >= struct.unpack('<I', head[4:8])[0] + 8
+    if not complete:
+        result['problem'] = 'truncated_image'
+    return result
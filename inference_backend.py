@@ -0,0 +1,379 @@
+"""CPU inference backends for the D.O.G. model: PyTorch, ONNX Runtime and OpenVINO.
+
+`load_backend('DOG.pt', 'onnx-int8')` exports the weights once and caches the artifact
+next to them (DOG.onnx, DOG_int8.onnx, DOG_openvino_model/, DOG_int8_openvino_model/),
+re-exporting only when the .pt file is newer or the export settings changed. ONNX and
+OpenVINO models are exported with dynamic input shapes, since the app, the inference
+server, batch prediction and tiled inference send batches (up to 16 frames) and other
+input sizes than the export imgsz. The artifact is loaded back through ultralytics.YOLO,
+so callers get the same Results objects whatever the backend.
+
+INT8 models are calibrated on images drawn from the merged dataset (master.yaml):
+ONNX with onnxruntime's static quantizer (the detect head is left in FP32, since
+quantizing the box regression costs the most accuracy), OpenVINO through
+Ultralytics' NNCF export.
+
+    python inference_backend.py export --backend onnx-int8 --data master.yaml
+    python inference_backend.py compare --backends torch onnx onnx-int8 openvino-int8 --data master.yaml
+    python inference_backend.py smoke --data master.yaml
+"""
+
+import re
+import json
+import time
+import shutil
+import argparse
+import threading
+from pathlib import Path
+
+import cv2
+import yaml
+import numpy as np
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8')
+DEFAULT_WEIGHTS = "DOG.pt"
+DEFAULT_DATA_YAML = Path(r"C:\Users\HP\Desktop\master_dataset\master.yaml")
+IMGSZ = 640
+CALIBRATION_IMAGES = 300
+# Recorded next to each exported artifact; an artifact exported with other settings is re-exported.
+EXPORT_SETTINGS = {'dynamic': True}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def artifact_path(weights, backend):
+    """Where the exported model for `backend` lives, next to the weights."""
+    weights = Path(weights)
+    return {
+        'torch': weights,
+        'onnx': weights.with_suffix('.onnx'),
+        'onnx-int8': weights.with_name(f"{weights.stem}_int8.onnx"),
+        'openvino': weights.with_name(f"{weights.stem}_openvino_model"),
+        'openvino-int8': weights.with_name(f"{weights.stem}_int8_openvino_model"),
+    }[backend]
+
+
+def _settings_path(artifact):
+    return artifact.with_name(f"{artifact.name}.export.json")
+
+
+def _is_current(artifact, weights):
+    if not (artifact.exists() and artifact.stat().st_mtime >= Path(weights).stat().st_mtime):
+        return False
+    try:
+        with open(_settings_path(artifact), 'r') as f:
+            return json.load(f) == EXPORT_SETTINGS
+    except (OSError, ValueError):
+        return False  # exported before the settings were recorded (static batch-1 shapes)
+
+
+def has_dynamic_shapes(artifact):
+    """Whether the model at `artifact` accepts any batch size and input size (.pt weights always do)."""
+    artifact = Path(artifact)
+    if artifact.suffix == '.pt':
+        return True
+    try:
+        with open(_settings_path(artifact), 'r') as f:
+            return bool(json.load(f).get('dynamic'))
+    except (OSError, ValueError):
+        return False
+
+
+def _place(exported, artifact):
+    """Moves an Ultralytics export to the cached artifact path if it landed elsewhere."""
+    exported = Path(exported)
+    if exported.resolve() == artifact.resolve():
+        return artifact
+    if artifact.exists():
+        shutil.rmtree(artifact) if artifact.is_dir() else artifact.unlink()
+    shutil.move(str(exported), str(artifact))
+    return artifact
+
+
+# --- Calibration data ---
+
+def dataset_images(data_yaml, split='train', limit=None, seed=0):
+    """Image paths for a split of a YOLO data yaml (folder or .txt image list), randomly sampled to `limit`."""
+    data_yaml = Path(data_yaml)
+    with open(data_yaml, 'r') as f:
+        data = yaml.safe_load(f)
+    base = Path(data.get('path') or data_yaml.parent)
+    source = Path(str(data.get(split) or data['train']))
+    if not source.is_absolute():
+        source = base / source
+
+    if source.suffix == '.txt':
+        with open(source, 'r') as f:
+            paths = [base / line.strip() for line in f if line.strip()]
+    else:
+        paths = sorted(p for p in source.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if limit and len(paths) > limit:
+        picked = np.random.default_rng(seed).choice(len(paths), size=limit, replace=False)
+        paths = [paths[i] for i in sorted(picked)]
+    return paths
+
+
+def letterbox_tensor(image, imgsz=IMGSZ):
+    """Resizes keeping aspect ratio, pads to imgsz x imgsz with gray, returns a 1x3xHxW float32 tensor."""
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    rgb = canvas[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(rgb, dtype=np.float32)[None] / 255.0
+
+
+def _calibration_reader(onnx_path, image_paths, imgsz):
+    from onnxruntime.quantization import CalibrationDataReader
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(str(onnx_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+                if image is not None:
+                    return {input_name: letterbox_tensor(image, imgsz)}
+            return None
+
+    return Reader()
+
+
+def _detect_head_nodes(onnx_model):
+    """Names of the nodes in the last '/model.N/' block, i.e. the YOLOv8 Detect head."""
+    indices = [int(m.group(1)) for node in onnx_model.graph.node
+               for m in [re.search(r'/model\.(\d+)/', node.name)] if m]
+    if not indices:
+        return []
+    head = f"/model.{max(indices)}/"
+    return [node.name for node in onnx_model.graph.node if head in node.name]
+
+
+def _quantize_onnx(fp32_path, int8_path, data_yaml, num_images, imgsz):
+    import onnx
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType
+
+    fp32_model = onnx.load(str(fp32_path))
+    image_paths = dataset_images(data_yaml, 'train', limit=num_images)
+    print(f"🔧 Calibrating INT8 ONNX on {len(image_paths)} images from {Path(data_yaml).name}...")
+    quantize_static(str(fp32_path), str(int8_path), _calibration_reader(fp32_path, image_paths, imgsz),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    nodes_to_exclude=_detect_head_nodes(fp32_model))
+
+    # Ultralytics reads class names, stride and imgsz from the ONNX metadata; keep it.
+    int8_model = onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+
+
+# --- Export / load ---
+
+def export_backend(weights=DEFAULT_WEIGHTS, backend='torch', data_yaml=DEFAULT_DATA_YAML, imgsz=IMGSZ,
+                   calibration_images=CALIBRATION_IMAGES, force=False):
+    """Exports the weights for `backend` unless an up-to-date artifact is cached. Returns its path."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    artifact = artifact_path(weights, backend)
+    if backend == 'torch' or (not force and _is_current(artifact, weights)):
+        return artifact
+    if backend.endswith('int8') and not Path(data_yaml).exists():
+        raise FileNotFoundError(f"INT8 calibration needs the merged dataset yaml, not found: {data_yaml}")
+
+    from ultralytics import YOLO
+    print(f"📦 Exporting {weights} for '{backend}'...")
+    start = time.perf_counter()
+    if backend == 'onnx':
+        _place(YOLO(str(weights)).export(format='onnx', imgsz=imgsz, simplify=True, **EXPORT_SETTINGS), artifact)
+    elif backend == 'onnx-int8':
+        fp32_path = export_backend(weights, 'onnx', data_yaml, imgsz, force=force)
+        _quantize_onnx(fp32_path, artifact, data_yaml, calibration_images, imgsz)
+    else:
+        kwargs = {'format': 'openvino', 'imgsz': imgsz, **EXPORT_SETTINGS}
+        if backend == 'openvino-int8':
+            total = len(dataset_images(data_yaml, 'train'))
+            kwargs.update(int8=True, data=str(data_yaml), fraction=min(1.0, calibration_images / max(total, 1)))
+        _place(YOLO(str(weights)).export(**kwargs), artifact)
+    with open(_settings_path(artifact), 'w') as f:
+        json.dump(EXPORT_SETTINGS, f)
+    print(f"✅ Exported {artifact} in {time.perf_counter() - start:.1f}s")
+    return artifact
+
+
+def load_backend(weights=DEFAULT_WEIGHTS, backend='torch', data_yaml=DEFAULT_DATA_YAML, imgsz=IMGSZ):
+    """Returns an ultralytics.YOLO running on `backend`, exporting it first if needed.
+
+    The model's `artifact_path` attribute names the file actually loaded, for cache keys.
+    """
+    from ultralytics import YOLO
+    artifact = export_backend(weights, backend, data_yaml, imgsz)
+    model = YOLO(str(artifact), task='detect')
+    model.artifact_path = str(artifact)
+    return model
+
+
+class BackgroundLoader:
+    """Runs load_backend in a daemon thread, then warms the model up on a dummy frame.
+
+    Callers can render or do other work and only block in result(). `timings` gets
+    'load_s' (import, export if needed, and load), 'first_inference_s' (the cold first
+    call, which pays for lazy initialization), 'warm_inference_s' (a second call) and
+    'ready_s' (construction until the model is usable).
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, backend='torch', imgsz=IMGSZ, warmup=True):
+        self.weights = weights
+        self.backend = backend
+        self.model = None
+        self.error = None
+        self.timings = {}
+        self.started = time.perf_counter()
+        self.done = threading.Event()
+        threading.Thread(target=self._run, args=(imgsz, warmup), daemon=True).start()
+
+    def _run(self, imgsz, warmup):
+        try:
+            start = time.perf_counter()
+            model = load_backend(self.weights, self.backend, imgsz=imgsz)
+            self.timings['load_s'] = round(time.perf_counter() - start, 3)
+            if warmup:
+                frame = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+                for name in ('first_inference_s', 'warm_inference_s'):
+                    start = time.perf_counter()
+                    model(frame, verbose=False)
+                    self.timings[name] = round(time.perf_counter() - start, 3)
+            self.model = model
+        except Exception as e:
+            self.error = e
+        finally:
+            self.timings['ready_s'] = round(time.perf_counter() - self.started, 3)
+            self.done.set()
+
+    @property
+    def ready(self):
+        return self.done.is_set()
+
+    def result(self, timeout=None):
+        """Waits for the model and returns it, re-raising any load error."""
+        self.done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.model
+
+
+# --- Smoke check ---
+
+def smoke_check(model, imgsz=IMGSZ):
+    """Runs a batch of 2 frames at imgsz and one frame at half imgsz through model.
+
+    These are the shapes the app's batching, batch prediction and tiled inference send;
+    a static-shape export fails here. Returns the seconds taken, raises on failure.
+    """
+    start = time.perf_counter()
+    frames = [np.full((480, 640, 3), 114, dtype=np.uint8), np.full((640, 480, 3), 114, dtype=np.uint8)]
+    results = model(frames, imgsz=imgsz, verbose=False)
+    if len(results) != 2:
+        raise RuntimeError(f"Batch of 2 returned {len(results)} results")
+    small = max(32, imgsz // 2 // 32 * 32)
+    if len(model(frames[0], imgsz=small, verbose=False)) != 1:
+        raise RuntimeError(f"imgsz={small} returned no result")
+    return time.perf_counter() - start
+
+
+# --- Comparison ---
+
+def _size_mb(path):
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob('*') if p.is_file()) / 1e6
+    return path.stat().st_size / 1e6
+
+
+def compare_backends(weights, data_yaml, backends, num_images=100, imgsz=IMGSZ, with_map=True):
+    """Latency (batch 1, CPU) and val mAP per backend, with deltas against the first backend."""
+    frames = [cv2.imread(str(p)) for p in dataset_images(data_yaml, 'val', limit=num_images)]
+    frames = [f for f in frames if f is not None]
+    rows = []
+    for backend in backends:
+        model = load_backend(weights, backend, data_yaml, imgsz)
+        for frame in frames[:3]:
+            model(frame, imgsz=imgsz, verbose=False)  # warm-up
+        times = []
+        for frame in frames:
+            start = time.perf_counter()
+            model(frame, imgsz=imgsz, verbose=False)
+            times.append(time.perf_counter() - start)
+        times_ms = np.array(times) * 1000
+        row = {'backend': backend, 'artifact': model.artifact_path, 'size_mb': round(_size_mb(model.artifact_path), 2),
+               'images': len(frames), 'ms_mean': round(float(times_ms.mean()), 2),
+               'ms_p50': round(float(np.percentile(times_ms, 50)), 2),
+               'ms_p95': round(float(np.percentile(times_ms, 95)), 2),
+               'fps': round(1000 / float(times_ms.mean()), 2)}
+        if with_map:
+            val = model.val(data=str(data_yaml), imgsz=imgsz, batch=1, device='cpu', plots=False, verbose=False)
+            row.update(map50=round(float(val.box.map50), 4), map50_95=round(float(val.box.map), 4))
+        rows.append(row)
+
+    baseline = rows[0]
+    for row in rows:
+        row['speedup'] = round(baseline['ms_mean'] / row['ms_mean'], 2)
+        if with_map:
+            row['map50_delta'] = round(row['map50'] - baseline['map50'], 4)
+            row['map50_95_delta'] = round(row['map50_95'] - baseline['map50_95'], 4)
+    return rows
+
+
+def print_comparison(rows):
+    print("\n📊 Backend comparison (CPU, batch 1):")
+    for row in rows:
+        line = (f"  - {row['backend']:<14} {row['ms_mean']:8.2f} ms (p95 {row['ms_p95']:.2f}) | "
+                f"{row['fps']:6.2f} FPS | x{row['speedup']:.2f} | {row['size_mb']:.1f} MB")
+        if 'map50' in row:
+            line += (f" | mAP50 {row['map50']:.4f} ({row['map50_delta']:+.4f})"
+                     f" | mAP50-95 {row['map50_95']:.4f} ({row['map50_95_delta']:+.4f})")
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export and compare CPU inference backends for the D.O.G. model.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name in ('export', 'compare', 'smoke'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--weights', default=DEFAULT_WEIGHTS)
+        sub.add_argument('--data', default=str(DEFAULT_DATA_YAML), help="Merged dataset yaml (calibration and val).")
+        sub.add_argument('--imgsz', type=int, default=IMGSZ)
+    export_parser, compare_parser = subparsers.choices['export'], subparsers.choices['compare']
+    export_parser.add_argument('--backend', choices=BACKENDS, required=True)
+    export_parser.add_argument('--calibration-images', type=int, default=CALIBRATION_IMAGES)
+    export_parser.add_argument('--force', action='store_true', help="Re-export even if a cached artifact is current.")
+    compare_parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['torch', 'onnx', 'onnx-int8'])
+    compare_parser.add_argument('--images', type=int, default=100, help="Val images timed per backend.")
+    compare_parser.add_argument('--no-map', action='store_true', help="Only measure latency.")
+    compare_parser.add_argument('--output', help="Also write the comparison as JSON.")
+    subparsers.choices['smoke'].add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_backend(args.weights, args.backend, args.data, args.imgsz, args.calibration_images, args.force)
+    elif args.command == 'smoke':
+        failed = []
+        for backend in args.backends:
+            try:
+                seconds = smoke_check(load_backend(args.weights, backend, args.data, args.imgsz), args.imgsz)
+                print(f"  ✅ {backend:<14} batch of 2 and half imgsz ok ({seconds:.2f}s)")
+            except Exception as e:
+                failed.append(backend)
+                print(f"  ❌ {backend:<14} {type(e).__name__}: {e}")
+        raise SystemExit(1 if failed else 0)
+    else:
+        rows = compare_backends(args.weights, args.data, args.backends, args.images, args.imgsz, not args.no_map)
+        print_comparison(rows)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(rows, f, indent=2)
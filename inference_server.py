@@ -0,0 +1,209 @@
+"""In-process micro-batching inference server shared by every Streamlit session and stream.
+
+All Streamlit sessions and WebRTC streams live in one process and share the model
+from get_model_loader. Instead of calling it from many threads at once, callers submit
+frames to a single worker thread. The worker takes the first waiting request, keeps
+collecting until it has `max_batch_size` frames or `max_wait_ms` has passed since
+that first request, runs one batched forward pass and hands each caller its own
+result. With more concurrent users the batches simply get fuller. The worker only
+waits out the deadline when recent concurrency says more requests are coming, so a
+lone client isn't slowed down by the batching window.
+
+Requests are only batched with others that use the same call options (e.g. conf).
+BatchedModel wraps the server in the same callable-with-.names interface as a YOLO
+model, so existing code keeps calling `model(frame, verbose=False)`.
+
+    python inference_server.py --weights DOG.pt --clients 1 2 4 8   # throughput vs. direct calls
+"""
+
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10
+
+
+class BatchingInferenceServer:
+    """Owns the model; a worker thread serves queued frames in dynamic batches."""
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, metrics=None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = metrics if metrics is not None and metrics.enabled else None
+        self.requests = queue.Queue()
+        self.pending = []  # requests taken off the queue that didn't match the last batch's options
+        self.batch_sizes = Counter()
+        self.served = 0
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.concurrency = 0  # peak in-flight requests over the last second
+        self.concurrency_reset = time.perf_counter()
+        self.started = time.perf_counter()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, frame, **kwargs):
+        """Queues one frame. Returns a Future resolving to that frame's Results object."""
+        if self.closed:
+            raise RuntimeError("Inference server is closed")
+        kwargs.pop('verbose', None)
+        future = Future()
+        with self.lock:
+            self.inflight += 1
+            self.concurrency = max(self.concurrency, self.inflight)
+        self.requests.put((tuple(sorted(kwargs.items())), frame, future, time.perf_counter()))
+        return future
+
+    def infer(self, source, **kwargs):
+        """Like model(source, **kwargs): a frame or a list of frames in, a list of Results out."""
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        futures = [self.submit(frame, **kwargs) for frame in frames]
+        return [future.result() for future in futures]
+
+    def _next_request(self, timeout=None):
+        if self.pending:
+            return self.pending.pop(0)
+        return self.requests.get(timeout=timeout) if timeout is None or timeout > 0 else self.requests.get_nowait()
+
+    def _collect(self):
+        """Blocks for a first request, then gathers same-option requests until full or the deadline."""
+        first = self._next_request()
+        if first is None:
+            return None
+        batch = [first]
+        now = time.perf_counter()
+        deadline = now + self.max_wait
+        if now - self.concurrency_reset > 1.0:
+            with self.lock:
+                self.concurrency = self.inflight
+            self.concurrency_reset = now
+        skipped = []
+        while len(batch) < self.max_batch_size:
+            # Already-queued requests are always taken; waiting only pays off with other active callers.
+            timeout = deadline - time.perf_counter() if self.concurrency > len(batch) else 0
+            try:
+                request = self._next_request(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)  # keep the shutdown signal for the next loop
+                break
+            (batch if request[0] == first[0] else skipped).append(request)
+        self.pending = skipped + self.pending
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            options, frames = dict(batch[0][0]), [request[1] for request in batch]
+            start = time.perf_counter()
+            try:
+                results = self.model(frames, verbose=False, **options)
+            except Exception as e:
+                with self.lock:
+                    self.inflight -= len(batch)
+                for request in batch:
+                    request[2].set_exception(e)
+                continue
+            if self.metrics:
+                self.metrics.record('server_batch', time.perf_counter() - start)
+                for request in batch:
+                    self.metrics.record('server_queue', start - request[3])
+            with self.lock:
+                self.inflight -= len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.served += len(batch)
+            for request, result in zip(batch, results):
+                request[2].set_result(result)
+
+    def stats(self):
+        # Copied under the lock: the worker adds new batch sizes while sessions read stats.
+        with self.lock:
+            batch_sizes, served = dict(self.batch_sizes), self.served
+            pending = len(self.pending)
+        batches = sum(batch_sizes.values())
+        elapsed = time.perf_counter() - self.started
+        return {'requests': served, 'batches': batches,
+                'mean_batch_size': round(served / batches, 2) if batches else 0.0,
+                'batch_sizes': dict(sorted(batch_sizes.items())),
+                'requests_per_s': round(served / elapsed, 2) if elapsed else 0.0,
+                'queued': self.requests.qsize() + pending}
+
+    def close(self):
+        self.closed = True
+        self.requests.put(None)
+        self.thread.join(timeout=5)
+
+
+class BatchedModel:
+    """Drop-in stand-in for a YOLO model that routes calls through a BatchingInferenceServer."""
+
+    def __init__(self, server):
+        self.server = server
+
+    def __call__(self, source, **kwargs):
+        return self.server.infer(source, **kwargs)
+
+    def __getattr__(self, name):
+        # names, artifact_path, val(), ... come from the wrapped model.
+        return getattr(self.server.model, name)
+
+
+def benchmark(model, frames, clients, requests_per_client):
+    """Images/s with `clients` threads calling the model directly (under a lock) vs. via the server."""
+    lock = threading.Lock()
+
+    def direct(frame):
+        with lock:
+            return model(frame, verbose=False)
+
+    def run(call):
+        def client(index):
+            for i in range(requests_per_client):
+                call(frames[(index + i) % len(frames)])
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return clients * requests_per_client / (time.perf_counter() - start)
+
+    server = BatchingInferenceServer(model)
+    try:
+        batched = run(lambda frame: server.infer(frame))
+        mean_batch = server.stats()['mean_batch_size']
+    finally:
+        server.close()
+    return {'clients': clients, 'direct_images_per_s': round(run(direct), 2),
+            'batched_images_per_s': round(batched, 2), 'mean_batch_size': mean_batch}
+
+
+if __name__ == '__main__':
+    import argparse
+    import numpy as np
+    from inference_backend import load_backend
+
+    parser = argparse.ArgumentParser(description="Compare direct vs. micro-batched inference under concurrent clients.")
+    parser.add_argument('--weights', default='DOG.pt')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--requests', type=int, default=30, help="Requests per client.")
+    args = parser.parse_args()
+
+    model = load_backend(args.weights, args.backend)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    model(frames[0], verbose=False)  # warm-up
+    print("\n📊 Throughput (images/s):")
+    for clients in args.clients:
+        row = benchmark(model, frames, clients, args.requests)
+        print(f"  - {clients:2d} clients: direct {row['direct_images_per_s']:7.2f} | "
+              f"batched {row['batched_images_per_s']:7.2f} (mean batch {row['mean_batch_size']})")
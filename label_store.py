@@ -0,0 +1,244 @@
+"""Columnar, memory-mapped store of every YOLO label row in a dataset.
+
+The label files are tokenized once and packed into NumPy arrays (class id, normalized
+box, split and file index, plus the original coordinate text of every row so rewritten
+label files keep their exact values). The arrays are cached as .npy files in `.label_cache/`
+inside the dataset and memory-mapped on later loads; the cache is rebuilt whenever a
+label file is added, removed or has a different mtime.
+
+    store = LabelStore.load(Path(r"C:\\Users\\HP\\Desktop\\master_dataset"))
+    counts = store.class_counts()                   # np.bincount over class ids
+    new_cls = store.remap_classes(lookup_table)     # vectorized class remap, -1 = dropped
+"""
+
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+SPLITS = ['train', 'valid', 'test']
+CACHE_DIR_NAME = '.label_cache'
+CACHE_VERSION = 2
+BOX_SIZE_BINS = np.array([0.0, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0])
+
+
+def _scan_label_files(dataset_path, splits):
+    """Lists (split index, file name, mtime_ns) for every label file, in a stable order."""
+    listing = []
+    for split_idx, split in enumerate(splits):
+        labels_dir = dataset_path / split / 'labels'
+        if not labels_dir.is_dir():
+            continue
+        with os.scandir(labels_dir) as entries:
+            files = sorted(
+                (entry.name, entry.stat().st_mtime_ns)
+                for entry in entries if entry.name.endswith('.txt')
+            )
+        listing.extend((split_idx, name, mtime) for name, mtime in files)
+    return listing
+
+
+class LabelStore:
+    """All label rows of a dataset as parallel NumPy columns.
+
+    Rows are grouped by file, so the rows of file `i` are
+    `file_offsets[i]:file_offsets[i + 1]`.
+    """
+
+    def __init__(self, dataset_path, splits, arrays, file_names):
+        self.dataset_path = Path(dataset_path)
+        self.splits = list(splits)
+        self.cls = arrays['cls']                    # int32   (rows,)
+        self.boxes = arrays['boxes']                # float32 (rows, 4) x, y, w, h
+        self.split = arrays['split']                # uint8   (rows,)
+        self.file_idx = arrays['file_idx']          # int32   (rows,)
+        self.file_split = arrays['file_split']      # uint8   (files,)
+        self.file_mtime = arrays['file_mtime']      # int64   (files,)
+        self.file_offsets = arrays['file_offsets']  # int64   (files + 1,)
+        self.text = arrays['text']                  # uint8   (bytes,) coordinate text of all rows
+        self.text_offsets = arrays['text_offsets']  # int64   (rows + 1,)
+        self.irregular_rows = int(arrays['irregular_rows'][0])
+        self.malformed_rows = int(arrays['malformed_rows'][0])
+        self.file_names = file_names
+        self._lookup = None
+
+    # --- Building and caching ---
+
+    @classmethod
+    def load(cls, dataset_path, splits=SPLITS, rebuild=False):
+        """Returns the store for `dataset_path`, memory-mapping the cache when it is up to date."""
+        dataset_path = Path(dataset_path)
+        cache_dir = dataset_path / CACHE_DIR_NAME
+        listing = _scan_label_files(dataset_path, splits)
+
+        if not rebuild:
+            store = cls._load_cache(dataset_path, splits, cache_dir, listing)
+            if store is not None:
+                return store
+
+        store = cls.build(dataset_path, splits, listing)
+        store._save_cache(cache_dir)
+        return store
+
+    @classmethod
+    def build(cls, dataset_path, splits=SPLITS, listing=None):
+        """Tokenizes every label file once.
+
+        Like the counting script, every row that starts with an integer class id is
+        counted. Rows with fewer than 4 numeric coordinates are kept as malformed (NaN
+        box), so class counts match while box statistics skip them.
+        """
+        dataset_path = Path(dataset_path)
+        if listing is None:
+            listing = _scan_label_files(dataset_path, splits)
+
+        cls_ids, coords, row_files, texts = [], [], [], []
+        offsets = [0]
+        irregular = malformed = 0
+        for file_idx, (split_idx, name, _) in enumerate(listing):
+            with open(dataset_path / splits[split_idx] / 'labels' / name, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if not parts:
+                        continue
+                    try:
+                        class_id = int(parts[0])
+                    except ValueError:
+                        continue
+                    try:
+                        box = [float(v) for v in parts[1:5]]
+                    except ValueError:
+                        box = []
+                    if len(box) < 4:
+                        malformed += 1
+                        box = [np.nan] * 4
+                    elif len(parts) != 5:
+                        irregular += 1  # e.g. segmentation polygons; only the first 4 values are kept
+                    cls_ids.append(class_id)
+                    coords.append(box)
+                    row_files.append(file_idx)
+                    texts.append(' '.join(parts[1:]).encode())
+            offsets.append(len(cls_ids))
+
+        file_split = np.array([s for s, _, _ in listing], dtype=np.uint8)
+        file_idx = np.array(row_files, dtype=np.int32)
+        text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=text_offsets[1:])
+        arrays = {
+            'cls': np.array(cls_ids, dtype=np.int32),
+            'boxes': np.array(coords, dtype=np.float32).reshape(-1, 4),
+            'split': file_split[file_idx],
+            'file_idx': file_idx,
+            'file_split': file_split,
+            'file_mtime': np.array([m for _, _, m in listing], dtype=np.int64),
+            'file_offsets': np.array(offsets, dtype=np.int64),
+            'text': np.frombuffer(b''.join(texts), dtype=np.uint8),
+            'text_offsets': text_offsets,
+            'irregular_rows': np.array([irregular], dtype=np.int64),
+            'malformed_rows': np.array([malformed], dtype=np.int64),
+        }
+        return cls(dataset_path, splits, arrays, [n for _, n, _ in listing])
+
+    def _save_cache(self, cache_dir):
+        cache_dir.mkdir(exist_ok=True)
+        for name in ('cls', 'boxes', 'split', 'file_idx', 'file_split', 'file_mtime', 'file_offsets',
+                     'text', 'text_offsets'):
+            np.save(cache_dir / f"{name}.npy", getattr(self, name))
+        for name in ('irregular_rows', 'malformed_rows'):
+            np.save(cache_dir / f"{name}.npy", np.array([getattr(self, name)], dtype=np.int64))
+        # The meta file is written last, so a half-written cache is never considered valid.
+        with open(cache_dir / 'meta.json', 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'splits': self.splits, 'files': self.file_names}, f)
+
+    @classmethod
+    def _load_cache(cls, dataset_path, splits, cache_dir, listing):
+        try:
+            with open(cache_dir / 'meta.json', 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_VERSION or meta.get('splits') != list(splits):
+            return None
+        if meta['files'] != [n for _, n, _ in listing]:
+            return None
+
+        try:
+            arrays = {
+                name: np.load(cache_dir / f"{name}.npy", mmap_mode='r')
+                for name in ('cls', 'boxes', 'split', 'file_idx', 'file_split', 'file_mtime',
+                             'file_offsets', 'text', 'text_offsets', 'irregular_rows', 'malformed_rows')
+            }
+        except (OSError, ValueError):
+            return None
+        current_split = np.array([s for s, _, _ in listing], dtype=np.uint8)
+        current_mtime = np.array([m for _, _, m in listing], dtype=np.int64)
+        if not (np.array_equal(arrays['file_split'], current_split)
+                and np.array_equal(arrays['file_mtime'], current_mtime)):
+            return None
+        return cls(dataset_path, splits, arrays, meta['files'])
+
+    # --- Queries ---
+
+    @property
+    def num_files(self):
+        return len(self.file_names)
+
+    def file_index(self, split, name):
+        """Returns the file index of `split/labels/name`, or None if it is not in the store."""
+        if self._lookup is None:
+            self._lookup = {
+                (self.splits[s], n): i for i, (s, n) in enumerate(zip(self.file_split.tolist(), self.file_names))
+            }
+        return self._lookup.get((split, name))
+
+    def class_counts(self, minlength=0):
+        """Instances per class id across all splits."""
+        valid = self.cls[self.cls >= 0]
+        return np.bincount(valid, minlength=minlength)
+
+    def label_files_per_split(self):
+        """Number of label files (i.e. images) per split name."""
+        counts = np.bincount(self.file_split, minlength=len(self.splits))
+        return {split: int(counts[i]) for i, split in enumerate(self.splits)}
+
+    def images_per_class(self, minlength=0):
+        """(splits, classes) array: number of images in each split containing each class."""
+        num_classes = max(minlength, int(self.cls.max()) + 1 if len(self.cls) else 0)
+        valid = self.cls >= 0
+        pairs = np.unique(self.file_idx[valid].astype(np.int64) * num_classes + self.cls[valid])
+        files, classes = np.divmod(pairs, num_classes)
+        out = np.zeros((len(self.splits), num_classes), dtype=np.int64)
+        np.add.at(out, (self.file_split[files], classes), 1)
+        return out
+
+    def box_size_histogram(self, bins=BOX_SIZE_BINS, minlength=0):
+        """(classes, bins - 1) histogram of box size, measured as sqrt(w * h) in normalized units."""
+        num_classes = max(minlength, int(self.cls.max()) + 1 if len(self.cls) else 0)
+        sizes = np.sqrt(np.clip(self.boxes[:, 2] * self.boxes[:, 3], 0.0, None))
+        bin_idx = np.clip(np.digitize(sizes, bins) - 1, 0, len(bins) - 2)
+        out = np.zeros((num_classes, len(bins) - 1), dtype=np.int64)
+        valid = (self.cls >= 0) & np.isfinite(sizes)
+        np.add.at(out, (self.cls[valid], bin_idx[valid]), 1)
+        return out
+
+    def remap_classes(self, lookup_table):
+        """Gathers new class ids through `lookup_table`; ids outside the table map to -1."""
+        lut = np.asarray(lookup_table, dtype=np.int32)
+        in_range = (self.cls >= 0) & (self.cls < len(lut))
+        return np.where(in_range, lut[np.clip(self.cls, 0, max(len(lut) - 1, 0))], -1).astype(np.int32)
+
+    def format_rows(self, file_idx, new_cls=None):
+        """Returns YOLO label lines for one file, dropping rows whose (remapped) class is -1.
+
+        Only the class id is rewritten; the rest of each row is the original text.
+        """
+        start, end = int(self.file_offsets[file_idx]), int(self.file_offsets[file_idx + 1])
+        classes = (self.cls if new_cls is None else new_cls)[start:end].tolist()
+        bounds = self.text_offsets[start:end + 1].tolist()
+        text = self.text[bounds[0]:bounds[-1]].tobytes()
+        base = bounds[0]
+        return [
+            f"{c} {text[bounds[i] - base:bounds[i + 1] - base].decode()}"
+            for i, c in enumerate(classes) if c >= 0
+        ]
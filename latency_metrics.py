@@ -0,0 +1,238 @@
+"""Per-stage latency histograms and FPS counters for the live detector and the app.
+
+Each stage (capture, preprocess, forward, boxes, draw, display, ...) keeps its last
+WINDOW samples in a ring buffer, and p50/p95/p99 are computed only when someone reads
+them. A disabled Metrics object hands out a shared no-op timer and returns from
+record() immediately, so leaving the calls in the hot path costs next to nothing.
+
+Metrics can be read as a dict/JSON, drawn onto a frame, or scraped in Prometheus
+text format from a small HTTP server on a local port (http://127.0.0.1:9108/metrics).
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_PORT = 9108
+
+
+class RollingHistogram:
+    """The last `window` latency samples (seconds) plus lifetime count and sum."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.filled = 0
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.filled = min(self.filled + 1, len(self.samples))
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        if not self.filled:
+            return {q: 0.0 for q in quantiles}
+        return dict(zip(quantiles, np.quantile(self.samples[:self.filled], quantiles).tolist()))
+
+    def mean(self):
+        return float(self.samples[:self.filled].mean()) if self.filled else 0.0
+
+
+class RateCounter:
+    """Events per second over the last `window` events."""
+
+    def __init__(self, window=120):
+        self.times = deque(maxlen=window)
+        self.count = 0
+
+    def tick(self):
+        self.times.append(time.perf_counter())
+        self.count += 1
+
+    @property
+    def rate(self):
+        if len(self.times) < 2:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Thread-safe registry of stage histograms and rate counters."""
+
+    def __init__(self, enabled=True, window=WINDOW, prefix='dog'):
+        self.enabled = enabled
+        self.window = window
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.rates = {}
+        self.started = time.time()
+        self.server = None
+
+    def stage(self, name):
+        """`with metrics.stage('draw'): ...` records the block's wall time under `name`."""
+        return _StageTimer(self, name) if self.enabled else _NULL_TIMER
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = RollingHistogram(self.window)
+            histogram.add(seconds)
+
+    def tick(self, name):
+        """Counts one event (e.g. a displayed frame) for the FPS counter `name`."""
+        if not self.enabled:
+            return
+        with self.lock:
+            counter = self.rates.get(name)
+            if counter is None:
+                counter = self.rates[name] = RateCounter()
+            counter.tick()
+
+    def record_model_speed(self, results):
+        """Records Ultralytics' own preprocess/forward/postprocess split (ms) from a results list."""
+        if not self.enabled or not results:
+            return
+        speed = getattr(results[0], 'speed', None) or {}
+        for key, stage in (('preprocess', 'preprocess'), ('inference', 'forward'), ('postprocess', 'nms')):
+            if speed.get(key) is not None:
+                self.record(stage, speed[key] / 1000.0)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.rates.clear()
+
+    # --- Export ---
+
+    def snapshot(self):
+        """Current metrics as a plain dict (latencies in ms)."""
+        with self.lock:
+            stages = {}
+            for name, histogram in self.histograms.items():
+                q = histogram.quantiles()
+                stages[name] = {'count': histogram.count, 'mean_ms': round(histogram.mean() * 1000, 3),
+                                **{f"p{int(k * 100)}_ms": round(v * 1000, 3) for k, v in q.items()}}
+            fps = {name: round(counter.rate, 2) for name, counter in self.rates.items()}
+        return {'uptime_s': round(time.time() - self.started, 1), 'window': self.window,
+                'stages': stages, 'fps': fps}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def dump_json(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_json() + '\n')
+
+    def prometheus_text(self):
+        """Prometheus exposition format: one summary for stage latencies, one gauge for FPS."""
+        name = f"{self.prefix}_stage_latency_seconds"
+        lines = [f"# HELP {name} Per-stage latency; quantiles over the last {self.window} samples.",
+                 f"# TYPE {name} summary"]
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                for q, value in histogram.quantiles().items():
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            fps_name = f"{self.prefix}_fps"
+            lines += [f"# HELP {fps_name} Events per second over the recent window.", f"# TYPE {fps_name} gauge"]
+            for counter_name, counter in sorted(self.rates.items()):
+                lines.append(f'{fps_name}{{counter="{counter_name}"}} {counter.rate:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=DEFAULT_PORT, host='127.0.0.1'):
+        """Serves /metrics (Prometheus text) and /metrics.json from a daemon thread. Idempotent."""
+        if self.server is not None:
+            return self.server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body, content_type = metrics.to_json().encode(), 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body, content_type = metrics.prometheus_text().encode(), 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def draw_overlay(self, frame, origin=(10, 20)):
+        """Draws one 'stage p50/p95/p99' line per stage plus the FPS counters onto frame."""
+        snapshot = self.snapshot()
+        lines = [f"{name:<10} {s['p50_ms']:6.1f} {s['p95_ms']:6.1f} {s['p99_ms']:6.1f} ms"
+                 for name, s in snapshot['stages'].items()]
+        lines += [f"{name:<10} {fps:6.1f} fps" for name, fps in snapshot['fps'].items()]
+        x, y = origin
+        for line in lines:
+            cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 0, 0), 3)
+            cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (255, 255, 255), 1)
+            y += 16
+        return frame
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_metrics(name='default', enabled=False):
+    """Process-wide Metrics object, so it survives Streamlit reruns like an imported module does."""
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = Metrics(enabled=enabled)
+        return _shared[name]
@@ -0,0 +1,297 @@
+"""Threaded capture -> inference -> render pipeline for the live detectors.
+
+Capture and inference run in their own threads and hand frames over through bounded
+queues that drop the oldest item when full, so a slow model never makes frames pile
+up: inference always works on the newest camera frame. Rendering stays on the main
+thread because cv2.imshow has to run there on most platforms.
+
+Sources can be a camera index, a video file, or 'synthetic' (generated frames), so the
+pipeline can be benchmarked headless without a camera.
+
+Pass a latency_metrics.Metrics as `metrics` to record per-stage latencies (capture,
+inference, render, display, end_to_end) and a display FPS counter, and to overlay
+them on the window.
+"""
+
+import time
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class LatestQueue:
+    """Bounded queue that drops its oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=1):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the next item, or None once the queue is closed and empty."""
+        with self.cond:
+            while not self.items and not self.closed:
+                if not self.cond.wait(timeout):
+                    return None
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StageStats:
+    """Frame counter with a rolling FPS over the last `window` frames."""
+
+    def __init__(self, window=60):
+        self.times = deque(maxlen=window)
+        self.count = 0
+        self.busy = 0.0
+
+    def tick(self, busy_seconds=0.0):
+        self.times.append(time.perf_counter())
+        self.count += 1
+        self.busy += busy_seconds
+
+    @property
+    def fps(self):
+        if len(self.times) < 2:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
+
+
+class SyntheticSource:
+    """cv2.VideoCapture-like source that generates moving frames, optionally paced to `fps`."""
+
+    def __init__(self, width=640, height=480, fps=30, num_frames=None):
+        self.width, self.height, self.fps = width, height, fps
+        self.num_frames = num_frames
+        self.index = 0
+        self.base = cv2.GaussianBlur(
+            np.random.default_rng(0).integers(0, 255, (height, width * 2, 3), dtype=np.uint8), (21, 21), 0)
+        self.next_time = time.perf_counter()
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.num_frames is not None and self.index >= self.num_frames:
+            return False, None
+        if self.fps:
+            self.next_time += 1.0 / self.fps
+            delay = self.next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        offset = (self.index * 4) % self.width
+        self.index += 1
+        return True, self.base[:, offset:offset + self.width].copy()
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_FRAME_WIDTH: self.width,
+                cv2.CAP_PROP_FRAME_HEIGHT: self.height}.get(prop, 0)
+
+    def release(self):
+        pass
+
+
+class PacedCapture:
+    """Wraps a video file so it is read at its own frame rate, like a camera would deliver it."""
+
+    def __init__(self, cap):
+        self.cap = cap
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        self.interval = 1.0 / fps
+        self.next_time = time.perf_counter()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        self.next_time += self.interval
+        delay = self.next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return self.cap.read()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(source, pace=True):
+    """Opens a camera index, a video file path, or 'synthetic'."""
+    if source == 'synthetic':
+        return SyntheticSource(fps=30 if pace else 0, num_frames=None if pace else 300)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    cap = cv2.VideoCapture(source)
+    if isinstance(source, str) and pace:
+        return PacedCapture(cap)
+    return cap
+
+
+class PipelineRunner:
+    """Runs capture, inference and rendering as three decoupled stages.
+
+    `infer_fn(frame)` returns model results; `render_fn(frame, results)` returns the image to show.
+    If the capture or inference stage raises, the pipeline stops and run() re-raises the error.
+    """
+
+    def __init__(self, cap, infer_fn, render_fn, display=True, window_name="YOLOv8 Live Detection",
+                 queue_size=1, show_stats=True, metrics=None):
+        self.cap = cap
+        self.infer_fn = infer_fn
+        self.render_fn = render_fn
+        self.display = display
+        self.window_name = window_name
+        self.show_stats = show_stats
+        self.capture_queue = LatestQueue(queue_size)
+        self.render_queue = LatestQueue(queue_size)
+        self.stop_event = threading.Event()
+        self.stats = {'capture': StageStats(), 'inference': StageStats(), 'render': StageStats()}
+        self.latencies = deque(maxlen=1000)
+        self.metrics = metrics if metrics is not None and metrics.enabled else None
+        self.error = None
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop_event.set()
+
+    def _capture_loop(self):
+        frame_id = 0
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                success, frame = self.cap.read()
+                if not success:
+                    break
+                if self.metrics:
+                    self.metrics.record('capture', time.perf_counter() - start)
+                self.stats['capture'].tick()
+                self.capture_queue.put((frame_id, time.perf_counter(), frame))
+                frame_id += 1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.capture_queue.close()
+
+    def _inference_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.capture_queue.get(timeout=0.5)
+                if item is None:
+                    if self.capture_queue.closed:
+                        break
+                    continue
+                frame_id, captured_at, frame = item
+                start = time.perf_counter()
+                results = self.infer_fn(frame)
+                busy = time.perf_counter() - start
+                self.stats['inference'].tick(busy)
+                if self.metrics:
+                    self.metrics.record('inference', busy)
+                self.render_queue.put((frame_id, captured_at, frame, results))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.render_queue.close()
+
+    def _draw_stats(self, frame):
+        text = (f"cap {self.stats['capture'].fps:4.1f} | inf {self.stats['inference'].fps:4.1f} | "
+                f"fps {self.stats['render'].fps:4.1f} | lat {self.latencies[-1] * 1000:5.0f} ms")
+        cv2.putText(frame, text, (10, frame.shape[0] - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+        cv2.putText(frame, text, (10, frame.shape[0] - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    def run(self, max_frames=None):
+        """Runs until the source ends, 'q' is pressed or `max_frames` are rendered. Returns the summary.
+
+        Re-raises the first exception raised in the capture or inference thread.
+        """
+        threads = [threading.Thread(target=self._capture_loop, daemon=True),
+                   threading.Thread(target=self._inference_loop, daemon=True)]
+        for t in threads:
+            t.start()
+        started = time.perf_counter()
+
+        try:
+            while max_frames is None or self.stats['render'].count < max_frames:
+                item = self.render_queue.get(timeout=0.5)
+                if item is None:
+                    if self.render_queue.closed:
+                        break
+                    continue
+                _, captured_at, frame, results = item
+                start = time.perf_counter()
+                output = self.render_fn(frame, results)
+                rendered = time.perf_counter()
+                self.latencies.append(rendered - captured_at)
+                self.stats['render'].tick(rendered - start)
+                if self.metrics:
+                    self.metrics.record('render', rendered - start)
+                    self.metrics.record('end_to_end', rendered - captured_at)
+
+                if self.display:
+                    if self.show_stats:
+                        self._draw_stats(output)
+                        if self.metrics:
+                            self.metrics.draw_overlay(output)
+                    start = time.perf_counter()
+                    cv2.imshow(self.window_name, output)
+                    key = cv2.waitKey(1) & 0xFF
+                    if self.metrics:
+                        self.metrics.record('display', time.perf_counter() - start)
+                    if key == ord("q"):
+                        break
+                if self.metrics:
+                    self.metrics.tick('frames')
+        finally:
+            self.stop_event.set()
+            self.capture_queue.close()
+            for t in threads:
+                t.join(timeout=2)
+            self.cap.release()
+            if self.display:
+                cv2.destroyAllWindows()
+
+        if self.error is not None:
+            raise self.error
+        return self.summary(time.perf_counter() - started)
+
+    def summary(self, elapsed):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'frames': {name: s.count for name, s in self.stats.items()},
+            'fps': {name: round(s.count / elapsed, 2) if elapsed > 0 else 0.0 for name, s in self.stats.items()},
+            'busy_ms_per_frame': {name: round(1000 * s.busy / s.count, 2) if s.count else 0.0
+                                  for name, s in self.stats.items()},
+            'dropped': {'before_inference': self.capture_queue.dropped, 'before_render': self.render_queue.dropped},
+            'latency_ms': {'mean': round(float(latencies.mean()), 2),
+                           'p50': round(float(np.percentile(latencies, 50)), 2),
+                           'p95': round(float(np.percentile(latencies, 95)), 2)},
+        }
+
+
+def print_summary(summary):
+    print("\n📊 Pipeline Summary:")
+    print(f"  Ran for {summary['elapsed_s']}s")
+    for stage in ('capture', 'inference', 'render'):
+        print(f"  - {stage:<9}: {summary['frames'][stage]:5d} frames | {summary['fps'][stage]:6.2f} FPS | "
+              f"{summary['busy_ms_per_frame'][stage]:6.2f} ms/frame")
+    print(f"  Dropped frames: {summary['dropped']}")
+    lat = summary['latency_ms']
+    print(f"  End-to-end latency: mean {lat['mean']} ms | p50 {lat['p50']} ms | p95 {lat['p95']} ms")
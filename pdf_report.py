@@ -0,0 +1,133 @@
+"""PDF reports for the Streamlit app's image and batch analyses.
+
+Kept out of milestone1STREAMLIT.PY so fpdf is only imported once a report is requested.
+Needs fpdf2 (pip install fpdf2) to embed images straight from memory; with the old
+PyFPDF 1.7 package each image goes through a temporary file instead.
+"""
+
+import io
+import os
+import tempfile
+from datetime import datetime
+from urllib.parse import quote_plus
+
+import cv2
+from fpdf import FPDF, FPDF_VERSION
+
+IN_MEMORY_IMAGES = not FPDF_VERSION.startswith('1.')  # fpdf2 accepts file-like objects in image()
+
+
+class PDF(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 15)
+        self.cell(0, 10, 'D.O.G. Vision System - Analysis Report', 0, 1, 'C')
+        self.set_font('Arial', '', 10)
+        self.cell(0, 10, f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 1, 'C')
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-20)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, 'Report by D.O.G. Vision | Developed by Utkarsh Tripathi, Aditya Kumar Raj & Abhiyanshu Kumar', 0, 0, 'C')
+        self.set_y(-15)
+        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+
+
+REPORT_IMAGE_MAX_WIDTH = 1200
+REPORT_JPEG_QUALITY = 85
+
+
+def _encode_report_jpeg(img):
+    """JPEG-encodes an image in memory, downscaled to REPORT_IMAGE_MAX_WIDTH. Returns (bytes, w, h)."""
+    height, width = img.shape[:2]
+    if width > REPORT_IMAGE_MAX_WIDTH:
+        img = cv2.resize(img, (REPORT_IMAGE_MAX_WIDTH, int(height * REPORT_IMAGE_MAX_WIDTH / width)),
+                         interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, REPORT_JPEG_QUALITY])
+    return buffer.tobytes(), img.shape[1], img.shape[0]
+
+
+def _pdf_embed_image(pdf, img, x, y, w):
+    """Places an image on the page from an in-memory JPEG (fpdf2) or a temporary file (PyFPDF 1.7)."""
+    data, _, _ = _encode_report_jpeg(img)
+    if IN_MEMORY_IMAGES:
+        pdf.image(io.BytesIO(data), x=x, y=y, w=w)
+        return
+    # PyFPDF 1.7 only reads images from disk; it parses the file inside image(), so it can go right after.
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as f:
+        f.write(data)
+    try:
+        pdf.image(f.name, x=x, y=y, w=w)
+    finally:
+        os.remove(f.name)
+
+
+def _pdf_output_bytes(pdf):
+    output = pdf.output(dest='S')
+    return output.encode('latin1') if isinstance(output, str) else bytes(output)
+
+
+def _add_analysis_section(pdf, original_img, annotated_img, detections, uploaded_filename):
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 10, f'Analysis for: {uploaded_filename}', 0, 1)
+    
+    page_width = pdf.w - 2 * pdf.l_margin
+    col_width = page_width / 2 - 5
+    
+    aspect_ratio = original_img.shape[0] / original_img.shape[1]
+    img_height = col_width * aspect_ratio
+
+    _pdf_embed_image(pdf, original_img, pdf.l_margin, pdf.get_y(), col_width)
+    _pdf_embed_image(pdf, annotated_img, pdf.l_margin + col_width + 10, pdf.get_y(), col_width)
+    
+    pdf.set_y(pdf.get_y() + img_height + 10)
+        
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 10, 'Detection Summary', 0, 1)
+    
+    if detections:
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(60, 10, 'Detected Object', 1, 0, 'C')
+        pdf.cell(40, 10, 'Confidence', 1, 0, 'C')
+        pdf.cell(90, 10, 'Web Search for Treatment', 1, 1, 'C')
+
+        pdf.set_font('Arial', '', 10)
+        for item, conf in sorted(detections, key=lambda x: x[1], reverse=True):
+            search_query = quote_plus(f"how to cure {item}")
+            search_url = f"https://www.google.com/search?q={search_query}"
+            pdf.cell(60, 10, item, 1, 0)
+            pdf.cell(40, 10, f'{conf:.2f}', 1, 0, 'C')
+            pdf.set_text_color(0, 0, 255)
+            pdf.set_font('Arial', 'U', 10)
+            pdf.cell(90, 10, "Click Here for Treatment Info", 1, 1, 'C', link=search_url)
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_font('Arial', '', 10)
+
+    else:
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(0, 10, 'No objects detected above the confidence threshold.', 0, 1)
+
+
+def generate_pdf_report(original_img, annotated_img, detections, uploaded_filename):
+    pdf = PDF()
+    pdf.add_page()
+    _add_analysis_section(pdf, original_img, annotated_img, detections, uploaded_filename)
+    return _pdf_output_bytes(pdf)
+
+
+def generate_batch_pdf_report(analyses):
+    """Builds one PDF with a page per analyzed image.
+
+    `analyses` is an iterable of (original_img, annotated_img, detections, filename). It is
+    consumed lazily and only the compressed JPEGs are kept, so pass a generator to keep
+    memory bounded for large surveys.
+    """
+    pdf = PDF()
+    for original_img, annotated_img, detections, filename in analyses:
+        pdf.add_page()
+        _add_analysis_section(pdf, original_img, annotated_img, detections, filename)
+    if pdf.page_no() == 0:
+        pdf.add_page()
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(0, 10, 'No images were analyzed.', 0, 1)
+    return _pdf_output_bytes(pdf)
@@ -0,0 +1,371 @@
+"""Packs a merged YOLO dataset into large tar shards for streaming training data loads.
+
+Tens of thousands of small image/label files are slow to read from network or cloud
+storage, where every open/stat is a round trip. export_shards() writes each split as a
+few sequential tar files in the WebDataset layout: a sample is `<key>.<image ext>`
+(the original image bytes, not re-encoded) followed by `<key>.txt` (its label rows),
+so any WebDataset-style tar loader can stream them. Shards are planned from file sizes
+up front and written in a process pool, several shards and splits at a time.
+
+Next to every shard, `<shard>.idx.json` stores the byte offsets of each member, so
+ShardReader can also fetch any sample with one seek and read. The export folder gets
+a `shards.json` manifest (sample and byte counts per shard) and a `dataset.yaml`
+listing the shards per split with the class names.
+
+    python shard_export.py export C:\\Users\\HP\\Desktop\\master_dataset --output master_shards
+    python shard_export.py bench C:\\Users\\HP\\Desktop\\master_dataset master_shards --split train
+"""
+
+import io
+import os
+import json
+import time
+import random
+import tarfile
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import yaml
+
+SPLITS = ['train', 'valid', 'test']
+YAML_SPLIT_NAMES = {'train': 'train', 'valid': 'val', 'test': 'test'}
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.webp']
+SHARD_SIZE_MB = 256
+MANIFEST_NAME = 'shards.json'
+YAML_NAME = 'dataset.yaml'
+INDEX_SUFFIX = '.idx.json'
+TAR_BLOCK = 512
+STREAM_BUFFER = 4 * 1024 * 1024
+
+
+# --- Export ---
+
+def list_samples(dataset_path, split):
+    """(key, image path, label path or None) for every image of a split, sorted by name.
+
+    Keys are the image stems with dots replaced, since WebDataset loaders group tar
+    members by the part of the name before the first dot.
+    """
+    image_dir = Path(dataset_path) / split / 'images'
+    label_dir = Path(dataset_path) / split / 'labels'
+    if not image_dir.is_dir():
+        return []
+    priority = {ext: i for i, ext in enumerate(IMAGE_EXTENSIONS)}
+    images = {}
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() in priority and (stem not in images or priority[ext.lower()] < priority[images[stem][1]]):
+                images[stem] = (entry.path, ext.lower())
+
+    samples, keys = [], set()
+    for stem in sorted(images):
+        key = stem.replace('.', '_')
+        while key in keys:
+            key += '_'
+        keys.add(key)
+        label_path = label_dir / f"{stem}.txt"
+        samples.append((key, images[stem][0], str(label_path) if label_path.exists() else None))
+    return samples
+
+
+def plan_shards(samples, shard_bytes):
+    """Groups samples into consecutive shards of at most shard_bytes (at least one sample each)."""
+    shards, current, size = [], [], 0
+    for sample in samples:
+        sample_bytes = os.path.getsize(sample[1]) + (os.path.getsize(sample[2]) if sample[2] else 0) + 3 * TAR_BLOCK
+        if current and size + sample_bytes > shard_bytes:
+            shards.append(current)
+            current, size = [], 0
+        current.append(sample)
+        size += sample_bytes
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _add_member(tar, name, data):
+    """Appends one file to tar. Returns (data offset, size) within the tar file."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(data))
+    # tar.offset now points past the data and its padding; headers can span several blocks
+    # (long or non-ASCII names), so the data start is found by walking back from the end.
+    padded = -(-len(data) // TAR_BLOCK) * TAR_BLOCK
+    return tar.offset - padded, len(data)
+
+
+def write_shard(job):
+    """Worker: writes one shard and its index. Returns the shard's manifest entry."""
+    shard_path, samples = job
+    index = []
+    with tarfile.open(shard_path, 'w', format=tarfile.GNU_FORMAT) as tar:
+        for key, image_path, label_path in samples:
+            ext = os.path.splitext(image_path)[1].lower()
+            with open(image_path, 'rb') as f:
+                image = _add_member(tar, f"{key}{ext}", f.read())
+            label_data = b''
+            if label_path:
+                with open(label_path, 'rb') as f:
+                    label_data = f.read()
+            label = _add_member(tar, f"{key}.txt", label_data)
+            index.append([key, ext, *image, *label])
+    with open(f"{shard_path}{INDEX_SUFFIX}", 'w') as f:
+        json.dump({'fields': ['key', 'ext', 'image_offset', 'image_size', 'label_offset', 'label_size'],
+                   'samples': index}, f)
+    return {'file': os.path.basename(shard_path), 'samples': len(index), 'bytes': os.path.getsize(shard_path)}
+
+
+def read_class_names(dataset_path):
+    """Class names from master.yaml (or data.yaml) in the dataset folder, as a list."""
+    for name in ('master.yaml', 'data.yaml'):
+        yaml_path = Path(dataset_path) / name
+        if yaml_path.exists():
+            with open(yaml_path) as f:
+                names = (yaml.safe_load(f) or {}).get('names', [])
+            return [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+    return []
+
+
+def export_shards(dataset_path, output_dir, shard_size_mb=SHARD_SIZE_MB, splits=SPLITS, workers=None,
+                  shuffle_seed=0):
+    """Writes every split of dataset_path as tar shards into output_dir. Returns the manifest.
+
+    The train split is shuffled with shuffle_seed before packing (merged datasets are
+    grouped by source, and streaming loaders only shuffle within a buffer); the other
+    splits keep their sorted order. shuffle_seed=None keeps train sorted too.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in list(output_dir.glob('*.tar')) + list(output_dir.glob(f'*.tar{INDEX_SUFFIX}')):
+        stale.unlink()
+
+    jobs, owners = [], []
+    for split in splits:
+        samples = list_samples(dataset_path, split)
+        if split == 'train' and shuffle_seed is not None:
+            random.Random(shuffle_seed).shuffle(samples)
+        for i, shard in enumerate(plan_shards(samples, shard_size_mb * 1024 * 1024)):
+            jobs.append((str(output_dir / f"{split}-{i:05d}.tar"), shard))
+            owners.append(split)
+
+    start = time.perf_counter()
+    manifest = {'format': 'webdataset-tar', 'shard_size_mb': shard_size_mb,
+                'names': read_class_names(dataset_path), 'splits': {split: {'samples': 0, 'bytes': 0, 'shards': []}
+                                                                    for split in splits}}
+    # Biggest shards first, so a split's last shard doesn't start after everything else finished.
+    order = sorted(range(len(jobs)), key=lambda i: -len(jobs[i][1]))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        entries = dict(zip(order, executor.map(write_shard, [jobs[i] for i in order])))
+    for i, split in enumerate(owners):
+        entry, summary = entries[i], manifest['splits'][split]
+        summary['shards'].append(entry)
+        summary['samples'] += entry['samples']
+        summary['bytes'] += entry['bytes']
+    manifest['elapsed_s'] = round(time.perf_counter() - start, 3)
+
+    with open(output_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    data_yaml = {'path': str(output_dir.resolve()), 'format': 'webdataset-tar'}
+    for split in splits:
+        if manifest['splits'][split]['shards']:
+            data_yaml[YAML_SPLIT_NAMES[split]] = [s['file'] for s in manifest['splits'][split]['shards']]
+    data_yaml['nc'] = len(manifest['names'])
+    data_yaml['names'] = dict(enumerate(manifest['names']))
+    with open(output_dir / YAML_NAME, 'w') as f:
+        yaml.safe_dump(data_yaml, f, sort_keys=False)
+    return manifest
+
+
+# --- Reading ---
+
+def parse_labels(data):
+    """YOLO label bytes -> (N, 5) float32 array of class, x, y, w, h. Malformed rows are skipped."""
+    rows = [line.split() for line in data.decode('utf-8', 'replace').splitlines()]
+    rows = [row for row in rows if len(row) == 5]
+    if not rows:
+        return np.zeros((0, 5), dtype=np.float32)
+    try:
+        return np.array(rows, dtype=np.float32)
+    except ValueError:
+        return np.array([row for row in rows if _is_numeric(row)], dtype=np.float32).reshape(-1, 5)
+
+
+def _is_numeric(row):
+    try:
+        [float(v) for v in row]
+        return True
+    except ValueError:
+        return False
+
+
+def decode_image(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def iter_tar_samples(fileobj):
+    """Streams (key, {ext: bytes}) samples out of a shard without its index (e.g. from a pipe)."""
+    key, members = None, {}
+    with tarfile.open(fileobj=fileobj, mode='r|') as tar:
+        for info in tar:
+            if not info.isfile():
+                continue
+            member_key, ext = info.name.split('.', 1)
+            if member_key != key and members:
+                yield key, members
+                members = {}
+            key = member_key
+            members['.' + ext] = tar.extractfile(info).read()
+    if members:
+        yield key, members
+
+
+class ShardReader:
+    """(image, labels) samples of one split of an export_shards folder.
+
+    Iterating streams the shards in order; indexing seeks straight to one sample through
+    the shard indexes. With decode=False images are returned as encoded bytes. File
+    handles are per process, so a reader can be shared with forked DataLoader workers.
+    """
+
+    def __init__(self, export_dir, split='train', decode=True):
+        self.export_dir = Path(export_dir)
+        self.decode = decode
+        with open(self.export_dir / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+        self.names = self.manifest['names']
+        self.shards = [entry['file'] for entry in self.manifest['splits'].get(split, {}).get('shards', [])]
+        self.indexes = []
+        for shard in self.shards:
+            with open(self.export_dir / f"{shard}{INDEX_SUFFIX}") as f:
+                self.indexes.append(json.load(f)['samples'])
+        self.offsets = np.cumsum([0] + [len(index) for index in self.indexes])
+        self._handles = {}
+        self._pid = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _sample(self, image, labels):
+        return (decode_image(image) if self.decode else image), parse_labels(labels)
+
+    def _handle(self, shard_idx):
+        if self._pid != os.getpid():
+            self._handles, self._pid = {}, os.getpid()
+        if shard_idx not in self._handles:
+            self._handles[shard_idx] = open(self.export_dir / self.shards[shard_idx], 'rb')
+        return self._handles[shard_idx]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        shard_idx = int(np.searchsorted(self.offsets, i, side='right')) - 1
+        _, _, image_offset, image_size, label_offset, label_size = self.indexes[shard_idx][i - self.offsets[shard_idx]]
+        f = self._handle(shard_idx)
+        f.seek(image_offset)
+        image = f.read(image_size)
+        f.seek(label_offset)
+        return self._sample(image, f.read(label_size))
+
+    def __iter__(self):
+        return self.samples()
+
+    def samples(self, shuffle_shards_seed=None):
+        """Streams every sample shard by shard; optionally in a seeded random shard order."""
+        order = list(range(len(self.shards)))
+        if shuffle_shards_seed is not None:
+            random.Random(shuffle_shards_seed).shuffle(order)
+        for shard_idx in order:
+            # Members are stored in index order, so this is one sequential pass over the file;
+            # the index only saves parsing the tar headers (iter_tar_samples does without it).
+            with open(self.export_dir / self.shards[shard_idx], 'rb', buffering=STREAM_BUFFER) as f:
+                for _, _, image_offset, image_size, label_offset, label_size in self.indexes[shard_idx]:
+                    f.seek(image_offset)
+                    image = f.read(image_size)
+                    f.seek(label_offset)
+                    yield self._sample(image, f.read(label_size))
+
+    def close(self):
+        for f in self._handles.values():
+            f.close()
+        self._handles = {}
+
+
+# --- Benchmark ---
+
+def _read_loose(dataset_path, split, decode):
+    """(image, labels) samples straight from the images/ and labels/ folders."""
+    for _, image_path, label_path in list_samples(dataset_path, split):
+        with open(image_path, 'rb') as f:
+            image = f.read()
+        labels = b''
+        if label_path:
+            with open(label_path, 'rb') as f:
+                labels = f.read()
+        yield (decode_image(image) if decode else image), parse_labels(labels)
+
+
+def benchmark_reads(dataset_path, export_dir, split='train', decode=False, seed=0):
+    """Samples/s for loose files vs. streamed shards vs. random access through the shard index.
+
+    Runs on whatever cache state the files are in; read the loose layout on the target
+    storage (or after dropping the page cache) to see the per-file overhead it has there.
+    """
+    reader = ShardReader(export_dir, split, decode=decode)
+    order = list(range(len(reader)))
+    random.Random(seed).shuffle(order)
+    total_bytes = reader.manifest['splits'][split]['bytes']
+
+    def timed(samples):
+        start = time.perf_counter()
+        count = sum(1 for _ in samples)
+        elapsed = time.perf_counter() - start
+        return {'samples': count, 'seconds': round(elapsed, 4),
+                'samples_per_s': round(count / elapsed, 1) if elapsed else None,
+                'mb_per_s': round(total_bytes / 1e6 / elapsed, 1) if elapsed else None}
+
+    results = {'split': split, 'decode': decode, 'shards': len(reader.shards),
+               'loose_files': timed(_read_loose(dataset_path, split, decode)),
+               'shard_stream': timed(reader.samples()),
+               'shard_random': timed(reader[i] for i in order)}
+    reader.close()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a YOLO dataset as tar shards, or benchmark reading them.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="Pack a merged dataset into shards.")
+    export.add_argument('dataset', help="Merged dataset folder (train/valid/test with images/ and labels/).")
+    export.add_argument('--output', required=True, help="Folder for the shards, index files, manifest and YAML.")
+    export.add_argument('--shard-size-mb', type=int, default=SHARD_SIZE_MB)
+    export.add_argument('--workers', type=int, default=None)
+    export.add_argument('--seed', type=int, default=0, help="Shuffle seed for the train split.")
+    export.add_argument('--no-shuffle', action='store_true', help="Keep the train split in sorted order.")
+    bench = commands.add_parser('bench', help="Compare reading the loose files with reading the shards.")
+    bench.add_argument('dataset')
+    bench.add_argument('shards')
+    bench.add_argument('--split', default='train', choices=SPLITS)
+    bench.add_argument('--decode', action='store_true', help="Also decode every image.")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        manifest = export_shards(args.dataset, args.output, args.shard_size_mb, workers=args.workers,
+                                 shuffle_seed=None if args.no_shuffle else args.seed)
+        print(f"✅ Shards written to {args.output} in {manifest['elapsed_s']:.1f}s")
+        for split, summary in manifest['splits'].items():
+            print(f"  - {split}: {summary['samples']} samples in {len(summary['shards'])} shards "
+                  f"({summary['bytes'] / 1e6:.1f} MB)")
+    else:
+        results = benchmark_reads(args.dataset, args.shards, args.split, args.decode)
+        print(f"\n📊 Reading '{args.split}' ({results['shards']} shards):")
+        for name in ('loose_files', 'shard_stream', 'shard_random'):
+            r = results[name]
+            print(f"  - {name:<12}: {r['samples']} samples in {r['seconds']:.2f}s "
+                  f"({r['samples_per_s']} samples/s, {r['mb_per_s']} MB/s)")
@@ -1,17 +1,27 @@
 import os
-import shutil
 from pathlib import Path
 import yaml
+import numpy as np
 from collections import Counter
 
+from dataset_manifest import Manifest, file_signature
+from label_store import LabelStore
+from combiningalldatasetfinalworking import materialize_image
+
 # --- CONFIGURATION ---
 
-# 1. Set the paths to your existing dataset and the new one to be created.
+# 1. Per-class mAP50-95 scores ("<class name> <score>" per line) and the threshold to keep.
+#    Classes scoring above MAP_THRESHOLD are kept. If the file is missing, the
+#    hand-picked list below is used instead.
+METRICS_PATH = Path(__file__).parent / "sortingpy.txt"
+MAP_THRESHOLD = 0.6
+
+# 2. Set the paths to your existing dataset and the new one to be created.
 original_dataset_path = Path(r"C:\Users\HP\Desktop\master_dataset")
-output_dataset_path = Path(r"C:\Users\HP\Desktop\master_dataset_filtered_0.6")
+output_dataset_path = Path(r"C:\Users\HP\Desktop") / f"master_dataset_filtered_{MAP_THRESHOLD}"
 original_yaml_path = original_dataset_path / "master.yaml"
 
-# 2. List of classes to KEEP (mAP50-95 > 0.6 from your results).
+# Fallback list of classes to KEEP (mAP50-95 > 0.6 from your results).
 high_accuracy_classes_to_keep = [
     'Healthy Wheat',
     'corn cerespora leaf spot',
@@ -40,13 +50,56 @@ high_accuracy_classes_to_keep = [
     'pig'
 ]
 
+# 3. Incremental mode: a manifest in the output folder lets reruns only touch
+#    label files that were added, changed or removed since the last run.
+INCREMENTAL = True
+MANIFEST_NAME = '.filter_manifest.json'
+
+# 4. Read labels through the cached columnar label store and remap them with a
+#    lookup-table gather instead of re-tokenizing every file.
+USE_LABEL_STORE = True
+
+# 5. View mode: only the remapped label files are written. Images are symlinked
+#    (hardlinked if symlinks aren't allowed) and master_new.yaml points at per-split
+#    image lists, so a new threshold costs label bytes rather than image bytes.
+#    The links are needed because YOLO finds each image's labels by swapping
+#    /images/ for /labels/ in its path, so the lists can't point at the originals.
+VIEW_MODE = True
+VIEW_LINK_MODES = ['symlink', 'hardlink']
+
 
 # --- SCRIPT LOGIC ---
 
+def load_class_scores(metrics_path):
+    """Reads '<class name> <score>' lines (tab or space separated) into a {name: score} dict.
+
+    Header lines and the 'Total Sum' line are skipped.
+    """
+    scores = {}
+    with open(metrics_path, 'r') as f:
+        for line in f:
+            parts = line.strip().rsplit(None, 1)
+            if len(parts) != 2:
+                continue
+            name, score = parts[0].strip(), parts[1]
+            try:
+                score = float(score)
+            except ValueError:
+                continue
+            if name.lower() != 'total sum':
+                scores[name] = score
+    return scores
+
 def process_and_remap_dataset():
     """Main function to filter, remap, and create the new dataset."""
     
-    print("🚀 Starting dataset filtering and remapping process (Threshold > 0.6)...")
+    print(f"🚀 Starting dataset filtering and remapping process (Threshold > {MAP_THRESHOLD})...")
+
+    classes_to_keep = high_accuracy_classes_to_keep
+    if METRICS_PATH and Path(METRICS_PATH).exists():
+        scores = load_class_scores(METRICS_PATH)
+        classes_to_keep = [name for name, score in scores.items() if score > MAP_THRESHOLD]
+        print(f"✅ Loaded {len(scores)} class scores from {Path(METRICS_PATH).name}.")
 
     # Load original YAML to get the full class list
     try:
@@ -68,19 +121,38 @@ def process_and_remap_dataset():
         return
 
     # Create the new class list and the remapping dictionary
-    final_class_list = [name for name in original_class_list if name in high_accuracy_classes_to_keep]
+    final_class_list = [name for name in original_class_list if name in classes_to_keep]
     final_class_map = {name: i for i, name in enumerate(final_class_list)}
     
     remapping_dict = {
         original_idx: final_class_map.get(name)
         for original_idx, name in enumerate(original_class_list)
-        if name in high_accuracy_classes_to_keep
+        if name in classes_to_keep
     }
     
     print(f"ℹ️  Kept {len(final_class_list)} high-accuracy classes. Discarded {len(original_class_list) - len(final_class_list)} classes.")
 
+    store = None
+    if USE_LABEL_STORE:
+        # Rows are rewritten from the stored coordinate text, so polygons and exact values are kept.
+        store = LabelStore.load(original_dataset_path)
+        lookup_table = np.full(len(original_class_list), -1, dtype=np.int32)
+        for original_idx, new_idx in remapping_dict.items():
+            lookup_table[original_idx] = new_idx
+        remapped_cls = store.remap_classes(lookup_table)
+
+    manifest = None
+    if INCREMENTAL:
+        manifest = Manifest(output_dataset_path / MANIFEST_NAME,
+                            {'original_classes': list(original_class_list), 'kept_classes': final_class_list,
+                             'view': VIEW_MODE})
+        if manifest.rebuilt:
+            print("ℹ️  Class selection or view mode changed since the last run, rebuilding everything.")
+    seen_keys = set()
+
     # Process each split (train, valid, test)
     stats = Counter()
+    bytes_written = Counter()
     for split in ['train', 'valid', 'test']:
         print(f"\n📂 Processing '{split}' split...")
         
@@ -100,45 +172,87 @@ def process_and_remap_dataset():
         for label_file in os.listdir(source_labels_path):
             if not label_file.endswith('.txt'):
                 continue
-            
+
+            image_path = None
+            for ext in ['.jpg', '.jpeg', '.png']:
+                candidate = source_images_path / f"{Path(label_file).stem}{ext}"
+                if candidate.exists():
+                    image_path = candidate
+                    break
+
+            key = f"{split}/{label_file}"
+            seen_keys.add(key)
+            sources = {'label': source_labels_path / label_file, 'image': image_path}
+            if manifest and manifest.is_current(key, sources):
+                stats['unchanged'] += 1
+                continue
+
+            outputs = []
             new_label_lines = []
-            with open(source_labels_path / label_file, 'r') as f:
-                for line in f:
-                    parts = line.strip().split()
-                    if not parts:
-                        continue
-                    
-                    old_class_id = int(parts[0])
-                    
-                    if old_class_id in remapping_dict:
-                        new_class_id = remapping_dict[old_class_id]
-                        new_line = f"{new_class_id} {' '.join(parts[1:])}"
-                        new_label_lines.append(new_line)
-            
+            file_idx = store.file_index(split, label_file) if store else None
+            if file_idx is not None:
+                new_label_lines = store.format_rows(file_idx, remapped_cls)
+            else:
+                with open(source_labels_path / label_file, 'r') as f:
+                    for line in f:
+                        parts = line.strip().split()
+                        if not parts:
+                            continue
+
+                        old_class_id = int(parts[0])
+
+                        if old_class_id in remapping_dict:
+                            new_class_id = remapping_dict[old_class_id]
+                            new_line = f"{new_class_id} {' '.join(parts[1:])}"
+                            new_label_lines.append(new_line)
+
             if new_label_lines:
                 with open(dest_labels_path / label_file, 'w') as f:
                     f.write('\n'.join(new_label_lines))
-                
-                copied = False
-                for ext in ['.jpg', '.jpeg', '.png']:
-                    image_path = source_images_path / f"{Path(label_file).stem}{ext}"
-                    if image_path.exists():
-                        shutil.copy(image_path, dest_images_path / image_path.name)
-                        stats[split] += 1
-                        copied = True
-                        break
-                if not copied:
+                outputs.append(dest_labels_path / label_file)
+                bytes_written['labels'] += (dest_labels_path / label_file).stat().st_size
+
+                if image_path:
+                    method = materialize_image(image_path, dest_images_path / image_path.name,
+                                               VIEW_LINK_MODES if VIEW_MODE else 'copy')
+                    outputs.append(dest_images_path / image_path.name)
+                    if method == 'copy':
+                        bytes_written['images'] += image_path.stat().st_size
+                    stats[split] += 1
+                else:
                      print(f"   - ⚠️ Warning: No image found for label {label_file}")
 
+            if manifest:
+                signatures = {role: file_signature(path) for role, path in sources.items() if path}
+                manifest.update(key, signatures, outputs)
+
+        if manifest:
+            manifest.save()
+
+    if manifest:
+        removed = manifest.prune(seen_keys)
+        if removed:
+            stats['removed'] = removed
+        manifest.save()
+
     print("\n✅ Dataset processing complete.")
     
+    split_sources = {'train': 'train/images', 'val': 'valid/images', 'test': 'test/images'}
+    if VIEW_MODE:
+        for yaml_key, split in (('train', 'train'), ('val', 'valid'), ('test', 'test')):
+            images_dir = output_dataset_path / split / "images"
+            names = sorted(os.listdir(images_dir)) if images_dir.is_dir() else []
+            with open(output_dataset_path / f"{split}.txt", 'w') as f:
+                f.writelines(f"./{split}/images/{name}\n" for name in names)
+            split_sources[yaml_key] = f"{split}.txt"
+
     # Create the new YAML file
     new_yaml_path = output_dataset_path / "master_new.yaml"
     new_yaml_data = {
         'path': str(output_dataset_path.resolve()),
-        'train': 'train/images',
-        'val': 'valid/images',
-        'test': 'test/images',
+        'train': split_sources['train'],
+        'val': split_sources['val'],
+        'test': split_sources['test'],
         'names': {i: name for i, name in enumerate(final_class_list)}
     }
     
@@ -149,6 +263,8 @@ def process_and_remap_dataset():
     print("\n📊 Summary of copied images:")
     for split, count in stats.items():
         print(f"   - {split}: {count} images")
+    print(f"   Bytes written: labels {bytes_written['labels'] / 1e6:.2f} MB, "
+          f"images {bytes_written['images'] / 1e6:.2f} MB")
 
 if __name__ == '__main__':
     process_and_remap_dataset()
@@ -0,0 +1,94 @@
+"""Generates synthetic YOLO datasets for benchmarking the dataset tools.
+
+Each source dataset gets its own data.yaml with a shuffled subset of the class pool,
+so merging has to remap class ids the same way it does for real Kaggle/Roboflow
+exports. Images are cheap smooth noise (upscaled from a tiny random grid), which
+compresses to realistic JPEG sizes without slowing the generator down.
+
+    python synthetic_dataset.py C:\\bench\\datasets_all --sources 4 --images 500
+"""
+
+import argparse
+from pathlib import Path
+
+import cv2
+import yaml
+import numpy as np
+
+SPLIT_FRACTIONS = {'train': 0.7, 'valid': 0.2, 'test': 0.1}
+
+
+def make_image(rng, width, height):
+    """A smooth random image, so JPEG sizes resemble photos rather than pure noise."""
+    grid = rng.integers(0, 256, (max(height // 32, 2), max(width // 32, 2), 3), dtype=np.uint8)
+    return cv2.resize(grid, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def make_labels(rng, num_classes, labels_per_image):
+    """Random YOLO rows: class id and a box kept fully inside the image."""
+    count = int(rng.integers(labels_per_image[0], labels_per_image[1] + 1))
+    sizes = rng.uniform(0.05, 0.5, (count, 2))
+    centers = rng.uniform(sizes / 2, 1 - sizes / 2)
+    cls_ids = rng.integers(0, num_classes, count)
+    return [f"{c} {x:.6f} {y:.6f} {w:.6f} {h:.6f}"
+            for c, (x, y), (w, h) in zip(cls_ids.tolist(), centers.tolist(), sizes.tolist())]
+
+
+def generate_dataset(dataset_path, class_names, num_images, labels_per_image=(1, 5), image_size=(640, 480),
+                     seed=0, split_fractions=SPLIT_FRACTIONS):
+    """Writes one YOLO dataset (split/images, split/labels and data.yaml). Returns its path."""
+    dataset_path = Path(dataset_path)
+    rng = np.random.default_rng(seed)
+    width, height = image_size
+
+    counts = {split: int(num_images * fraction) for split, fraction in split_fractions.items()}
+    counts['train'] += num_images - sum(counts.values())
+
+    for split, count in counts.items():
+        image_dir = dataset_path / split / 'images'
+        label_dir = dataset_path / split / 'labels'
+        image_dir.mkdir(parents=True, exist_ok=True)
+        label_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(count):
+            stem = f"{split}_{i:06d}"
+            cv2.imwrite(str(image_dir / f"{stem}.jpg"), make_image(rng, width, height))
+            with open(label_dir / f"{stem}.txt", 'w') as f:
+                f.write('\n'.join(make_labels(rng, len(class_names), labels_per_image)))
+
+    with open(dataset_path / 'data.yaml', 'w') as f:
+        yaml.safe_dump({'train': '../train/images', 'val': '../valid/images', 'test': '../test/images',
+                        'nc': len(class_names), 'names': list(class_names)}, f, sort_keys=False)
+    return dataset_path
+
+
+def generate_sources(root, class_pool, num_sources=3, classes_per_source=10, images_per_source=200,
+                     labels_per_image=(1, 5), image_size=(640, 480), seed=0):
+    """Writes `num_sources` datasets under root, each using a random subset of class_pool.
+
+    Returns the list of dataset paths.
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(num_sources):
+        picked = rng.choice(len(class_pool), size=min(classes_per_source, len(class_pool)), replace=False)
+        class_names = [class_pool[j] for j in picked]
+        paths.append(generate_dataset(Path(root) / f"source_{i:02d}", class_names, images_per_source,
+                                      labels_per_image, image_size, seed=seed + i + 1))
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic YOLO source datasets.")
+    parser.add_argument('root', help="Folder to create the source datasets in.")
+    parser.add_argument('--sources', type=int, default=3)
+    parser.add_argument('--classes', type=int, default=10, help="Classes per source dataset.")
+    parser.add_argument('--images', type=int, default=200, help="Images per source dataset.")
+    parser.add_argument('--labels-per-image', type=int, nargs=2, default=(1, 5), metavar=('MIN', 'MAX'))
+    parser.add_argument('--image-size', type=int, nargs=2, default=(640, 480), metavar=('W', 'H'))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from combiningalldatasetfinalworking import master_class_list
+    for path in generate_sources(args.root, master_class_list, args.sources, args.classes, args.images,
+                                 tuple(args.labels_per_image), tuple(args.image_size), args.seed):
+        print(f"📂 Wrote {path}")
@@ -1,6 +1,10 @@
+import argparse
 import cv2
 from ultralytics import YOLO
 
+from tracking import DetectThenTrack, draw_track_ids, DIFF_THRESHOLD
+from detection_postprocess import results_to_array, filter_detections, class_mask, iter_detections
+
 
 model = YOLO('best.pt')
 
@@ -56,8 +60,27 @@ HIGH_ACCURACY_CLASSES = [
 ]
 
 
+allowed_classes = class_mask(model.names, HIGH_ACCURACY_CLASSES)
+
+
+def detect_filtered(frame):
+    results = model(frame, stream=True)
+    return filter_detections(results_to_array(results), CONFIDENCE_THRESHOLD, allowed_classes)
+
+
 # --- Main Logic ---
 
+parser = argparse.ArgumentParser(description="Live YOLOv8 detection, filtered to the high-accuracy classes.")
+parser.add_argument('--track-every', type=int, default=None, metavar='N',
+                    help="Run the detector every N frames and track boxes with optical flow in between.")
+parser.add_argument('--diff-threshold', type=float, default=DIFF_THRESHOLD,
+                    help="Mean pixel change (0-255) that triggers an early detector run in tracking mode; 0 disables.")
+args = parser.parse_args()
+
+tracker = None
+if args.track_every:
+    tracker = DetectThenTrack(detect_filtered, detect_every=args.track_every, diff_threshold=args.diff_threshold)
+
 cap = cv2.VideoCapture(0)
 if not cap.isOpened():
     print("Error: Could not open webcam.")
@@ -66,25 +89,18 @@ if not cap.isOpened():
 while True:
     success, frame = cap.read()
     if success:
-        results = model(frame, stream=True)
-
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                confidence = box.conf[0]
-                cls_id = int(box.cls[0])
-                class_name = model.names[cls_id]
-
-               
-                if class_name in HIGH_ACCURACY_CLASSES and confidence > CONFIDENCE_THRESHOLD:
-                    
-                 
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 3) # Green box for high confidence
-
-                    label = f'{class_name} {confidence:.2f}'
-                    cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        if tracker:
+            detections, ids = tracker.update(frame)
+        else:
+            detections = detect_filtered(frame)
+        for x1, y1, x2, y2, confidence, cls_id in iter_detections(detections):
+            class_name = model.names[cls_id]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 3) # Green box for high confidence
+
+            label = f'{class_name} {confidence:.2f}'
+            cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        if tracker:
+            draw_track_ids(frame, detections, ids)
 
         cv2.imshow("YOLOv8 Live Detection (Filtered)", frame)
 
@@ -95,3 +111,9 @@ while True:
 
 cap.release()
 cv2.destroyAllWindows()
+
+if tracker:
+    s = tracker.stats()
+    print(f"🎯 Detector ran on {s['detector_runs']}/{s['frames']} frames (duty cycle {s['duty_cycle']:.0%}, "
+          f"{s['gate_fires']} early runs from scene changes), {s['fps']:.1f} FPS vs "
+          f"{s['detector_only_fps']:.1f} detecting every frame (x{s['fps_gain']})")
@@ -0,0 +1,25 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from inference_backend import BACKENDS, DEFAULT_DATA_YAML, DEFAULT_WEIGHTS, load_backend, smoke_check
+
+pytest.importorskip('ultralytics')
+WEIGHTS = Path(os.environ.get('DOG_WEIGHTS', DEFAULT_WEIGHTS))
+DATA_YAML = Path(os.environ.get('DOG_DATA_YAML', DEFAULT_DATA_YAML))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backend_runs_batch_of_two(backend):
+    if not WEIGHTS.exists():
+        pytest.skip(f"weights not found: {WEIGHTS}")
+    if backend.endswith('int8') and not DATA_YAML.exists():
+        pytest.skip(f"INT8 calibration dataset not found: {DATA_YAML}")
+    if backend != 'torch':
+        pytest.importorskip('openvino' if backend.startswith('openvino') else 'onnxruntime')
+    smoke_check(load_backend(WEIGHTS, backend, DATA_YAML))
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from live_pipeline import PipelineRunner, SyntheticSource
+
+
+class _FailingSource(SyntheticSource):
+    def read(self):
+        if self.index >= 3:
+            raise OSError("camera disconnected")
+        return super().read()
+
+
+def _run_in_thread(runner):
+    """Runs runner.run() in a thread; returns (finished, error)."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['summary'] = runner.run()
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    return not thread.is_alive(), outcome.get('error')
+
+
+def test_run_reraises_inference_error():
+    calls = []
+
+    def infer(frame):
+        calls.append(frame)
+        if len(calls) == 3:
+            raise RuntimeError("model failed")
+        return None
+
+    runner = PipelineRunner(SyntheticSource(width=64, height=48, fps=0), infer, lambda frame, results: frame,
+                            display=False)
+    finished, error = _run_in_thread(runner)
+    assert finished, "run() hung after infer_fn raised"
+    assert isinstance(error, RuntimeError) and str(error) == "model failed"
+    assert runner.render_queue.closed
+
+
+def test_run_reraises_capture_error():
+    runner = PipelineRunner(_FailingSource(width=64, height=48, fps=0), lambda frame: None,
+                            lambda frame, results: frame, display=False)
+    finished, error = _run_in_thread(runner)
+    assert finished, "run() hung after the source raised"
+    assert isinstance(error, OSError)
+
+
+def test_run_returns_summary_when_source_ends():
+    runner = PipelineRunner(SyntheticSource(width=64, height=48, fps=0, num_frames=5), lambda frame: None,
+                            lambda frame, results: frame, display=False)
+    summary = runner.run()
+    assert summary['frames']['capture'] == 5
+    assert runner.error is None
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,285 @@
+"""Tiled inference for large orthomosaics and drone images.
+
+The image is read window by window through a TileReader, cut into overlapping
+tile_size x tile_size tiles, and the tiles go through the model `batch_size` at a
+time, with the next batch read in a background thread while the model runs. Boxes
+are shifted back into image coordinates and merged with a global class-aware NMS
+(intersection over the smaller box, so a lesion cut off at a tile edge is absorbed
+by the whole one). With a windowed reader, tile memory is bounded by two batches
+(the one in the model and the one being read), 2 * batch_size * tile_size^2 * 3
+bytes, whatever the image size.
+
+Readers, in order of preference:
+  - rasterio windowed reads for anything GDAL can open (GeoTIFF/TIFF, JPEG, PNG, ...;
+    optional dependency)
+  - uncompressed TIFF through tifffile.memmap (optional), and .npy through np.load(mmap_mode='r')
+  - otherwise the image is decoded whole with cv2 and spilled to a memory-mapped .npy.
+    Peak memory is then the full decoded image (width * height * 3 bytes), so this
+    fallback is refused above MAX_DECODE_PIXELS; install rasterio or convert the
+    mosaic to a tiled GeoTIFF for bigger images
+
+    python tiled_inference.py mosaic.tif --weights DOG.pt --tile 640 --overlap 0.2 --output detections.json
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from detection_postprocess import EMPTY_DETECTIONS, result_to_array, non_max_suppression
+from image_headers import read_image_size
+
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_BATCH_SIZE = 8
+MERGE_THRESHOLD = 0.6
+PREVIEW_MAX_SIDE = 2048
+PAD_VALUE = 114
+MAX_DECODE_PIXELS = 150_000_000  # full-decode fallback limit, about 450 MB of BGR pixels
+
+
+# --- Readers ---
+
+class ArrayReader:
+    """Tiles out of an (H, W, 3) BGR array, typically a np.memmap.
+
+    `full_decode` marks arrays that were decoded whole before tiling (the cv2 fallback).
+    """
+
+    def __init__(self, array, full_decode=False):
+        self.array = array
+        self.height, self.width = array.shape[:2]
+        self.full_decode = full_decode
+
+    def read(self, x, y, w, h):
+        return np.ascontiguousarray(self.array[y:y + h, x:x + w])
+
+    def preview(self, max_side=PREVIEW_MAX_SIDE):
+        """Downscaled copy and its scale. Strided slicing first, so only sampled rows are touched."""
+        step = max(1, int(max(self.height, self.width) // (max_side * 2)))
+        sampled = np.ascontiguousarray(self.array[::step, ::step])
+        scale = min(1.0, max_side / max(sampled.shape[:2])) / step
+        preview = cv2.resize(sampled, (max(1, int(self.width * scale)), max(1, int(self.height * scale))),
+                             interpolation=cv2.INTER_AREA)
+        return preview, scale
+
+    def close(self):
+        # Dropping the last reference unmaps the file, so the spill folder can be removed.
+        self.array = None
+
+
+class RasterioReader:
+    """Windowed reads through GDAL; only the requested window (and GDAL's block cache) is decoded."""
+
+    full_decode = False
+
+    def __init__(self, path):
+        import warnings
+        import rasterio
+        from rasterio.windows import Window
+        self.window_cls = Window
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', rasterio.errors.NotGeoreferencedWarning)  # plain JPEG/PNG
+            self.dataset = rasterio.open(path)
+        self.width, self.height = self.dataset.width, self.dataset.height
+        self.bands = [3, 2, 1] if self.dataset.count >= 3 else [1, 1, 1]  # RGB file -> BGR tiles
+
+    def _to_bgr(self, data):
+        data = np.moveaxis(data, 0, -1)
+        if data.dtype != np.uint8:
+            data = cv2.normalize(data, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        return np.ascontiguousarray(data)
+
+    def read(self, x, y, w, h):
+        return self._to_bgr(self.dataset.read(self.bands, window=self.window_cls(x, y, w, h)))
+
+    def preview(self, max_side=PREVIEW_MAX_SIDE):
+        scale = min(1.0, max_side / max(self.width, self.height))
+        shape = (3, max(1, int(self.height * scale)), max(1, int(self.width * scale)))
+        return self._to_bgr(self.dataset.read(self.bands, out_shape=shape)), scale
+
+    def close(self):
+        self.dataset.close()
+
+
+def _as_bgr(array):
+    if array.ndim == 2:
+        return cv2.cvtColor(np.asarray(array), cv2.COLOR_GRAY2BGR)
+    if array.shape[2] == 4:
+        return cv2.cvtColor(np.asarray(array), cv2.COLOR_BGRA2BGR)
+    return array
+
+
+def open_tile_reader(path, workdir=None, max_decode_pixels=MAX_DECODE_PIXELS):
+    """Picks the cheapest reader for `path`. workdir holds the spill file for decoded images.
+
+    Raises ValueError if the image can't be read by window and is larger than
+    max_decode_pixels (None disables the limit), or if it can't be decoded at all.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.npy':
+        return ArrayReader(_as_bgr(np.load(path, mmap_mode='r')))
+    try:
+        return RasterioReader(path)
+    except (ImportError, OSError):
+        pass  # no rasterio, or a format GDAL can't open (RasterioIOError is an OSError)
+    if suffix in ('.tif', '.tiff'):
+        try:
+            import tifffile
+            array = tifffile.memmap(str(path))  # raises ValueError for compressed TIFFs
+            if array.ndim == 3 and array.shape[2] >= 3:
+                array = array[:, :, 2::-1]  # RGB -> BGR view, still memory-mapped
+            return ArrayReader(_as_bgr(array))
+        except (ImportError, ValueError):
+            pass
+
+    size = read_image_size(path)
+    if size and max_decode_pixels and size[0] * size[1] > max_decode_pixels:
+        raise ValueError(
+            f"{path.name} is {size[0]}x{size[1]} ({size[0] * size[1] / 1e6:.0f} MP); without windowed reads it "
+            f"would be decoded whole ({size[0] * size[1] * 3 / 1e9:.1f} GB). Install rasterio "
+            f"(pip install rasterio) or convert it to a tiled GeoTIFF.")
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not decode {path}")
+    if workdir is None:
+        return ArrayReader(image, full_decode=True)
+    spill_path = Path(workdir) / f"{path.stem}.npy"
+    np.save(spill_path, image)
+    del image
+    return ArrayReader(np.load(spill_path, mmap_mode='r'), full_decode=True)
+
+
+# --- Tiling ---
+
+def tile_origins(length, tile_size, stride):
+    """Tile start offsets along one axis; the last tile is aligned to the edge."""
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size + 1, stride))
+    if origins[-1] != length - tile_size:
+        origins.append(length - tile_size)
+    return origins
+
+
+def tile_windows(width, height, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """(x, y, w, h) of every overlapping tile covering the image."""
+    stride = max(1, int(tile_size * (1 - overlap)))
+    return [(x, y, min(tile_size, width - x), min(tile_size, height - y))
+            for y in tile_origins(height, tile_size, stride)
+            for x in tile_origins(width, tile_size, stride)]
+
+
+def _read_batch(reader, windows, tile_size):
+    tiles = []
+    for x, y, w, h in windows:
+        tile = reader.read(x, y, w, h)
+        if w < tile_size or h < tile_size:
+            tile = cv2.copyMakeBorder(tile, 0, tile_size - h, 0, tile_size - w, cv2.BORDER_CONSTANT,
+                                      value=(PAD_VALUE,) * 3)
+        tiles.append(tile)
+    return tiles
+
+
+def tiled_detect(reader, model, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, batch_size=TILE_BATCH_SIZE,
+                 conf=0.05, merge_threshold=MERGE_THRESHOLD, on_progress=None):
+    """Runs the model over overlapping tiles and merges the boxes.
+
+    Returns (detections, stats): an (N, 6) array in full-image pixel coordinates and a
+    dict with tile counts, timings and throughput. `on_progress(done, total)` is
+    called after every batch.
+    """
+    windows = tile_windows(reader.width, reader.height, tile_size, overlap)
+    batches = [windows[i:i + batch_size] for i in range(0, len(windows), batch_size)]
+    parts = []
+    read_s = infer_s = 0.0
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        pending = prefetch.submit(_read_batch, reader, batches[0], tile_size)
+        for index, batch in enumerate(batches):
+            wait_start = time.perf_counter()
+            tiles = pending.result()
+            read_s += time.perf_counter() - wait_start
+            if index + 1 < len(batches):
+                pending = prefetch.submit(_read_batch, reader, batches[index + 1], tile_size)
+
+            infer_start = time.perf_counter()
+            results = model(tiles, conf=conf, imgsz=tile_size, verbose=False)
+            infer_s += time.perf_counter() - infer_start
+            for (x, y, w, h), result in zip(batch, results):
+                detections = result_to_array(result)
+                if len(detections):
+                    detections[:, [0, 2]] = np.clip(detections[:, [0, 2]] + x, x, x + w)
+                    detections[:, [1, 3]] = np.clip(detections[:, [1, 3]] + y, y, y + h)
+                    parts.append(detections)
+            if on_progress:
+                on_progress(min((index + 1) * batch_size, len(windows)), len(windows))
+
+    raw = np.concatenate(parts) if parts else EMPTY_DETECTIONS
+    merged = non_max_suppression(raw, merge_threshold, metric='ios')
+    elapsed = time.perf_counter() - start
+    stats = {
+        'image_size': [reader.width, reader.height], 'tile_size': tile_size, 'overlap': overlap,
+        'tiles': len(windows), 'batches': len(batches), 'batch_size': batch_size,
+        'elapsed_s': round(elapsed, 3), 'read_wait_s': round(read_s, 3), 'inference_s': round(infer_s, 3),
+        'tiles_per_s': round(len(windows) / elapsed, 2) if elapsed else 0.0,
+        'megapixels_per_s': round(reader.width * reader.height / 1e6 / elapsed, 2) if elapsed else 0.0,
+        # Two batches are alive at once: the one in the model and the one being prefetched. With a
+        # full-decode reader the whole image was also in memory once, while it was decoded.
+        'tile_buffer_mb': round(2 * batch_size * tile_size * tile_size * 3 / 1e6, 1),
+        'full_decode': reader.full_decode,
+        'raw_detections': int(len(raw)), 'merged_detections': int(len(merged)),
+    }
+    return merged, stats
+
+
+def scale_detections(detections, scale):
+    """Detections rescaled for drawing on a preview image."""
+    scaled = detections.copy()
+    scaled[:, :4] *= scale
+    return scaled
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tiled YOLO inference over a large image.")
+    parser.add_argument('image')
+    parser.add_argument('--weights', default='DOG.pt')
+    parser.add_argument('--backend', default=os.environ.get('DOG_BACKEND', 'torch'))
+    parser.add_argument('--tile', type=int, default=TILE_SIZE)
+    parser.add_argument('--overlap', type=float, default=TILE_OVERLAP)
+    parser.add_argument('--batch-size', type=int, default=TILE_BATCH_SIZE)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--output', help="Write detections and stats as JSON.")
+    parser.add_argument('--preview', help="Write an annotated, downscaled preview image.")
+    args = parser.parse_args()
+
+    import tempfile
+    from inference_backend import load_backend
+
+    model = load_backend(args.weights, args.backend)
+    with tempfile.TemporaryDirectory(prefix="dog_tiles_") as workdir:
+        reader = open_tile_reader(args.image, workdir)
+        detections, stats = tiled_detect(reader, model, args.tile, args.overlap, args.batch_size, args.conf,
+                                         on_progress=lambda done, total: print(f"\r   {done}/{total} tiles", end=''))
+        print(f"\n✅ {stats['merged_detections']} detections ({stats['raw_detections']} before merging) | "
+              f"{stats['tiles']} tiles at {stats['tiles_per_s']} tiles/s, {stats['megapixels_per_s']} MP/s")
+        if args.preview:
+            preview, scale = reader.preview()
+            for x1, y1, x2, y2, confidence, cls_id in scale_detections(detections, scale).tolist():
+                cv2.rectangle(preview, (int(x1), int(y1)), (int(x2), int(y2)), (0, 191, 255), 2)
+            cv2.imwrite(args.preview, preview)
+        reader.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'stats': stats, 'detections': [
+                {'class_id': int(c), 'class_name': model.names[int(c)], 'confidence': round(float(p), 4),
+                 'box': [round(float(v), 1) for v in (x1, y1, x2, y2)]}
+                for x1, y1, x2, y2, p, c in detections.tolist()]}, f, indent=2)
@@ -0,0 +1,206 @@
+"""Detect-then-track: skip detector runs on frames where the scene hasn't changed.
+
+The detector runs every `detect_every` frames, or earlier when a cheap frame-difference
+gate fires (mean absolute difference of a small grayscale thumbnail against the last
+detected frame). In between, boxes are carried along with sparse Lucas-Kanade optical
+flow: corners inside the boxes are tracked and each box moves by the median shift of its
+own points. Detections are matched to tracks by IoU (same class), so each leaf keeps one
+ID for as long as it stays in view, and distinct objects can be counted instead of
+per-frame detections.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from detection_postprocess import EMPTY_DETECTIONS
+
+DETECT_EVERY = 5
+DIFF_THRESHOLD = 12.0
+IOU_MATCH = 0.3
+MAX_MISSES = 2
+MIN_HITS = 2
+FLOW_SCALE = 0.5
+THUMBNAIL_SIZE = (64, 48)
+
+_LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class FrameDiffGate:
+    """Fires when a frame's thumbnail differs from the reference by more than `threshold` (0-255)."""
+
+    def __init__(self, threshold=DIFF_THRESHOLD):
+        self.threshold = threshold
+        self.reference = None
+
+    def thumbnail(self, gray):
+        return cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+    def changed(self, thumbnail):
+        if self.reference is None or not self.threshold:
+            return False
+        return float(cv2.absdiff(thumbnail, self.reference).mean()) > self.threshold
+
+
+class DetectThenTrack:
+    """Wraps `detect_fn(frame) -> (N, 6) detections` with frame skipping and an optical-flow tracker."""
+
+    def __init__(self, detect_fn, detect_every=DETECT_EVERY, diff_threshold=DIFF_THRESHOLD,
+                 iou_threshold=IOU_MATCH, max_misses=MAX_MISSES, min_hits=MIN_HITS, flow_scale=FLOW_SCALE):
+        self.detect_fn = detect_fn
+        self.detect_every = detect_every
+        self.gate = FrameDiffGate(diff_threshold)
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.flow_scale = flow_scale
+
+        # Track state as parallel arrays: boxes (N, 4), conf, cls, id, hits, misses.
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.conf = np.zeros(0, dtype=np.float32)
+        self.cls = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+        self.next_id = 1
+        self.distinct = {}  # class id -> number of confirmed tracks
+
+        self.prev_gray = None
+        self.since_detect = 0
+        self.frames = 0
+        self.detector_runs = 0
+        self.gate_fires = 0
+        self.detect_time = 0.0
+        self.track_time = 0.0
+
+    def update(self, frame):
+        """Returns (detections, ids) for frame: the visible tracks as (N, 6) rows and their IDs."""
+        self.frames += 1
+        small = cv2.resize(frame, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        thumbnail = self.gate.thumbnail(gray)
+
+        due = self.detector_runs == 0 or self.since_detect + 1 >= self.detect_every
+        fired = not due and self.gate.changed(thumbnail)
+        if due or fired:
+            self.gate_fires += fired
+            start = time.perf_counter()
+            detections = self.detect_fn(frame)
+            self.detect_time += time.perf_counter() - start
+            self.detector_runs += 1
+            self.since_detect = 0
+            self.gate.reference = thumbnail
+            self._associate(detections)
+        else:
+            start = time.perf_counter()
+            self._propagate(self.prev_gray, gray)
+            self.track_time += time.perf_counter() - start
+            self.since_detect += 1
+        self.prev_gray = gray
+
+        visible = self.misses == 0
+        rows = np.column_stack([self.boxes[visible], self.conf[visible], self.cls[visible]]).astype(np.float32)
+        return (rows if len(rows) else EMPTY_DETECTIONS), self.ids[visible]
+
+    def _associate(self, detections):
+        """Greedy same-class IoU matching of detections to tracks; unmatched detections start tracks."""
+        boxes, conf, cls = detections[:, :4], detections[:, 4], detections[:, 5].astype(np.int64)
+        iou = iou_matrix(self.boxes, boxes)
+        if iou.size:
+            iou[self.cls[:, None] != cls[None, :]] = 0
+        matched_tracks, matched_dets = set(), set()
+        for flat in np.argsort(-iou, axis=None):
+            t, d = np.unravel_index(flat, iou.shape)
+            if iou[t, d] < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_dets:
+                continue
+            matched_tracks.add(t)
+            matched_dets.add(d)
+            self.boxes[t], self.conf[t] = boxes[d], conf[d]
+            self.hits[t] += 1
+            self.misses[t] = 0
+            if self.hits[t] == self.min_hits:
+                self.distinct[int(cls[d])] = self.distinct.get(int(cls[d]), 0) + 1
+
+        unmatched = np.array([t not in matched_tracks for t in range(len(self.boxes))], dtype=bool)
+        self.misses[unmatched] += 1
+        keep = self.misses <= self.max_misses
+
+        new = np.array([d for d in range(len(boxes)) if d not in matched_dets], dtype=np.int64)
+        new_ids = np.arange(self.next_id, self.next_id + len(new))
+        self.next_id += len(new)
+        self.boxes = np.concatenate([self.boxes[keep], boxes[new]]).astype(np.float32)
+        self.conf = np.concatenate([self.conf[keep], conf[new]]).astype(np.float32)
+        self.cls = np.concatenate([self.cls[keep], cls[new]])
+        self.ids = np.concatenate([self.ids[keep], new_ids])
+        self.hits = np.concatenate([self.hits[keep], np.ones(len(new), dtype=np.int64)])
+        self.misses = np.concatenate([self.misses[keep], np.zeros(len(new), dtype=np.int64)])
+        if self.min_hits <= 1:
+            for c in cls[new].tolist():
+                self.distinct[c] = self.distinct.get(c, 0) + 1
+
+    def _propagate(self, prev_gray, gray):
+        """Moves each visible track by the median optical-flow shift of the corners inside it."""
+        visible = np.flatnonzero(self.misses == 0)
+        if prev_gray is None or not len(visible):
+            return
+        boxes = self.boxes[visible] * self.flow_scale
+        mask = np.zeros_like(prev_gray)
+        for x1, y1, x2, y2 in boxes.astype(np.int32).tolist():
+            mask[max(y1, 0):y2, max(x1, 0):x2] = 255
+        points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=60 * len(visible), qualityLevel=0.01,
+                                         minDistance=4, mask=mask)
+        if points is None:
+            return
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **_LK_PARAMS)
+        ok = status.ravel() == 1
+        start, shift = points.reshape(-1, 2)[ok], (moved - points).reshape(-1, 2)[ok]
+        if not len(start):
+            return
+        global_shift = np.median(shift, axis=0)
+        for row, (x1, y1, x2, y2) in zip(visible, boxes.tolist()):
+            inside = (start[:, 0] >= x1) & (start[:, 0] <= x2) & (start[:, 1] >= y1) & (start[:, 1] <= y2)
+            # Too few points of its own (e.g. a flat leaf): follow the camera motion instead.
+            dx, dy = np.median(shift[inside], axis=0) if inside.sum() >= 3 else global_shift
+            self.boxes[row] += np.array([dx, dy, dx, dy], dtype=np.float32) / self.flow_scale
+
+    def stats(self):
+        """Duty cycle, counts and the FPS gained over running the detector on every frame."""
+        detect_ms = 1000 * self.detect_time / self.detector_runs if self.detector_runs else 0.0
+        tracked = self.frames - self.detector_runs
+        track_ms = 1000 * self.track_time / tracked if tracked else 0.0
+        busy = self.detect_time + self.track_time
+        fps = self.frames / busy if busy else 0.0
+        detector_only_fps = 1000 / detect_ms if detect_ms else 0.0
+        return {'frames': self.frames, 'detector_runs': self.detector_runs, 'gate_fires': self.gate_fires,
+                'duty_cycle': round(self.detector_runs / self.frames, 3) if self.frames else 0.0,
+                'detect_ms': round(detect_ms, 2), 'track_ms': round(track_ms, 2),
+                'fps': round(fps, 1), 'detector_only_fps': round(detector_only_fps, 1),
+                'fps_gain': round(fps / detector_only_fps, 2) if detector_only_fps else 0.0,
+                'tracks_started': self.next_id - 1, 'distinct': dict(sorted(self.distinct.items()))}
+
+
+def draw_track_ids(frame, detections, ids, color=(255, 255, 255)):
+    """Writes '#id' at the bottom-left corner of each box."""
+    for (x1, y1, x2, y2), track_id in zip(detections[:, :4].astype(np.int32).tolist(), ids.tolist()):
+        label = f"#{track_id}"
+        cv2.putText(frame, label, (x1 + 4, y2 - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
+        cv2.putText(frame, label, (x1 + 4, y2 - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
+    return frame